@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark against the local stand-in calculator
+Runs each scraper on the fixture server and reports countries per minute,
+p95 latency per measurement, peak RSS of the scraper plus its browsers, and
+how many values differ from what the calculator shows
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+import psutil
+from fixture_server import FixtureServer
+from calculator_page import use_calculator_page
+from rate_limiter import RateLimiter
+from carbon_calculator_scraper import TerrapassCarbonCalculator
+from multi_tab_smart_scraper import MultiTabSmartScraper
+from multi_tab_smart_scraper_business import MultiTabSmartBusinessScraper
+from cdp_engine import AsyncCalculatorScraper
+from calculator_profiles import PROFILES
+
+BENCHMARK_COUNTRIES = ["United States", "Albania", "Angola", "Argentina", "Austria", "Belgium", "Brazil", "Chile"]
+
+# name -> (scraper class, run options matching how the scraper's main runs it)
+BENCHMARKS = {
+    "carbon": (TerrapassCarbonCalculator, {"num_tabs": 1, "pool_spares": 1}),
+    "multi_tab": (MultiTabSmartScraper, {"num_tabs": 4}),
+    "multi_tab_business": (MultiTabSmartBusinessScraper, {"num_tabs": 2}),
+    "multi_tab_states": (partial(MultiTabSmartScraper, state_sweep=True), {"num_tabs": 4}),
+    "cdp": (partial(AsyncCalculatorScraper, PROFILES["individual"]), {"num_tabs": 8})
+}
+
+
+class RssSampler:
+    def __init__(self, interval=0.5):
+        """Track the peak RSS of this process and every process it started (chromedriver, Chrome)"""
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+
+
+def run_benchmark(name, server, countries, output_dir):
+    """Run one scraper against the fixture and return its numbers"""
+    scraper_class, options = BENCHMARKS[name]
+    # No request budget, so the numbers show the scraper itself
+    scraper = scraper_class(rate_limiter=RateLimiter(rate=None))
+    scraper.output_prefix = os.path.join(output_dir, scraper.output_prefix)
+    business = scraper.profile.name == "business"
+
+    sampler = RssSampler()
+    sampler.start()
+    start_time = time.time()
+    try:
+        scraper.run(countries=countries, checkpoint_file=None,
+                    results_file=os.path.join(output_dir, f"{name}_rows.csv"), **options)
+    finally:
+        elapsed = time.time() - start_time
+        sampler.stop()
+
+    measurement = scraper.timer.build_report()["phases"].get("measurement", {})
+    completed = [country for country, results in scraper.results.items() if results]
+    mismatches = sum(1 for country in completed for kwh, value in scraper.results[country].items()
+                     if abs(value - server.expected_value(country, kwh, business)) > 0.01)
+    return {
+        "scraper": name,
+        "countries": len(completed),
+        "states_required": len(scraper.states_required_countries),
+        "measurements": measurement.get("count", 0),
+        "seconds": elapsed,
+        "countries_per_minute": len(completed) / elapsed * 60 if elapsed else 0.0,
+        "p95_measurement_seconds": measurement.get("p95"),
+        "peak_rss_mb": sampler.peak_mb,
+        "mismatches": mismatches
+    }
+
+
+def run_benchmarks(names=None, countries=None, filename="benchmark_results.json", **server_options):
+    """Run the named benchmarks (all by default) on one fixture server
+
+    server_options go to FixtureServer, e.g. result_latency=1.0 or
+    failure_rate=0.05.
+    """
+    server = FixtureServer(**server_options).start()
+    use_calculator_page(server.page_url)
+    output_dir = tempfile.mkdtemp(prefix="terrapass_benchmark_")
+    results = []
+    try:
+        for name in names or BENCHMARKS:
+            print(f"\n=== Benchmark: {name} ===")
+            results.append(run_benchmark(name, server, countries or BENCHMARK_COUNTRIES, output_dir))
+    finally:
+        server.stop()
+
+    print("\n" + "="*50)
+    print("BENCHMARK RESULTS")
+    print("="*50)
+    print(f"{'Scraper':<20} {'Countries':>9} {'Per min':>8} {'p95 s':>7} {'Peak RSS MB':>12} {'Mismatches':>11}")
+    for result in results:
+        p95 = result["p95_measurement_seconds"]
+        print(f"{result['scraper']:<20} {result['countries']:>9} {result['countries_per_minute']:>8.1f} "
+              f"{p95 if p95 is not None else float('nan'):>7.2f} {result['peak_rss_mb']:>12.0f} "
+              f"{result['mismatches']:>11}")
+
+    with open(filename, "w") as f:
+        json.dump({"server": server_options, "results": results}, f, indent=2)
+    print(f"\nBenchmark results saved to {filename} (scraper output in {output_dir})")
+    return results
+
+
+def main():
+    """Run the benchmarks: python benchmark.py [carbon|multi_tab|multi_tab_business|multi_tab_states|cdp ...]"""
+    names = sys.argv[1:] or None
+    unknown = [name for name in names or [] if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks {unknown}; choose from: {', '.join(BENCHMARKS)}")
+        return
+    run_benchmarks(names)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Pool of warm browsers parked inside the calculator
+Replacement browsers are launched and navigated in the background, so
+swapping out a broken or recycled driver does not block the scraping loop
+"""
+import queue
+import threading
+import time
+
+
+class BrowserPool:
+    def __init__(self, launch, spares=1, health_check=None, max_launch_failures=3):
+        """Create a pool; launch() must return a driver already inside the calculator"""
+        self.launch = launch
+        self.spares = spares  # Warm drivers kept ready besides the ones handed out
+        self.health_check = health_check  # health_check(driver) -> bool
+        self.max_launch_failures = max_launch_failures  # Consecutive failures before acquire() gives up
+        self.ready = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0  # Launches in progress
+        self.launch_failures = 0  # Consecutive failed launches
+        self.closed = False
+        self.stats = {"launched": 0, "failed_launches": 0, "replaced": 0, "unhealthy": 0, "wait_time": 0.0}
+
+    def start(self, count=1):
+        """Launch count drivers for immediate use plus the spares"""
+        for _ in range(count + self.spares):
+            self.launch_async()
+
+    def launch_async(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.pending += 1
+        threading.Thread(target=self._launch_worker, daemon=True).start()
+
+    def _launch_worker(self):
+        try:
+            start_time = time.time()
+            driver = self.launch()
+        except Exception as e:
+            print(f"[Pool] Browser launch failed: {e}")
+            with self.lock:
+                self.pending -= 1
+                self.launch_failures += 1
+                self.stats["failed_launches"] += 1
+            return
+
+        with self.lock:
+            self.pending -= 1
+            self.launch_failures = 0
+            self.stats["launched"] += 1
+            closed = self.closed
+        if closed:
+            quit_driver(driver)
+            return
+        print(f"[Pool] Warm browser ready in {time.time() - start_time:.1f}s")
+        self.ready.put(driver)
+
+    def top_up(self):
+        """Start launches until ready plus pending drivers cover the spares"""
+        with self.lock:
+            missing = self.spares - self.ready.qsize() - self.pending
+            if self.launch_failures >= self.max_launch_failures:
+                missing = 0
+        for _ in range(missing):
+            self.launch_async()
+
+    def acquire(self, timeout=None):
+        """Take a warm driver, waiting for a launch in progress if none is ready"""
+        start_time = time.time()
+        while True:
+            try:
+                driver = self.ready.get(timeout=1)
+                break
+            except queue.Empty:
+                with self.lock:
+                    failed = self.launch_failures >= self.max_launch_failures and self.pending == 0
+                if failed or self.closed:
+                    raise RuntimeError("No browser available from the pool")
+                if timeout is not None and time.time() - start_time > timeout:
+                    raise RuntimeError(f"No browser available from the pool after {timeout}s")
+                if self.pending == 0:
+                    self.launch_async()
+
+        self.stats["wait_time"] += time.time() - start_time
+        self.top_up()
+        return driver
+
+    def check(self, driver):
+        """Whether a driver still responds and is on the calculator"""
+        if self.health_check is None:
+            return True
+        try:
+            return bool(self.health_check(driver))
+        except Exception:
+            return False
+
+    def release(self, driver):
+        """Hand a driver back for reuse, or discard it if it is no longer healthy"""
+        if self.closed or not self.check(driver):
+            self.discard(driver)
+            return
+        self.ready.put(driver)
+
+    def discard(self, driver):
+        """Quit a driver in the background and launch a replacement"""
+        threading.Thread(target=quit_driver, args=(driver,), daemon=True).start()
+        self.top_up()
+
+    def replace(self, driver, unhealthy=False):
+        """Discard a driver and return a warm one in its place"""
+        self.stats["replaced"] += 1
+        if unhealthy:
+            self.stats["unhealthy"] += 1
+        self.discard(driver)
+        return self.acquire()
+
+    def close(self):
+        """Quit every ready driver; launches still in progress quit themselves"""
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                quit_driver(self.ready.get_nowait())
+            except queue.Empty:
+                break
+
+    def report(self):
+        print(f"[Pool] Launched {self.stats['launched']} browsers ({self.stats['failed_launches']} failed), "
+              f"replaced {self.stats['replaced']} ({self.stats['unhealthy']} unhealthy), "
+              f"waited {self.stats['wait_time']:.1f}s for warm browsers")
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
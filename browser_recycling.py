@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Memory and latency aware browser recycling
+Samples the RSS of chromedriver and its Chrome processes plus the per-step
+latency after every country, and retires a browser only once it crosses a
+memory or slowdown threshold
+"""
+import statistics
+import threading
+import psutil
+
+
+class RecyclePolicy:
+    def __init__(self, max_rss_mb=1500, max_slowdown=2.0, baseline_countries=3, window=5):
+        """Thresholds shared by every browser of a run"""
+        self.max_rss_mb = max_rss_mb  # Retire when chromedriver + Chrome RSS exceeds this
+        self.max_slowdown = max_slowdown  # Retire when recent step latency exceeds the baseline by this factor
+        self.baseline_countries = baseline_countries  # Countries used for the latency baseline
+        self.window = window  # Recent countries compared against the baseline
+        self.lock = threading.Lock()
+        self.monitors = []
+        self.retirements = []  # (label, reason)
+
+    def monitor(self, driver, label):
+        """Start tracking a freshly launched browser"""
+        monitor = BrowserMonitor(self, driver, label)
+        with self.lock:
+            self.monitors.append(monitor)
+        return monitor
+
+    def retired(self, monitor, reason):
+        with self.lock:
+            self.retirements.append((monitor.label, reason))
+
+    def report(self):
+        """Print the thresholds, the sampled metrics per browser and why browsers were retired"""
+        with self.lock:
+            monitors = list(self.monitors)
+            retirements = list(self.retirements)
+        if not monitors:
+            return
+
+        print(f"\nBrowser recycling: max RSS {self.max_rss_mb} MB, max slowdown {self.max_slowdown:.1f}x "
+              f"(baseline {self.baseline_countries} countries, window {self.window})")
+        print(f"{'Browser':<16} {'Countries':>9} {'Peak RSS MB':>12} {'Baseline s/step':>16} {'Recent s/step':>14}")
+        for monitor in monitors:
+            baseline = monitor.baseline_latency()
+            recent = monitor.recent_latency()
+            print(f"{monitor.label:<16} {len(monitor.latencies):>9} "
+                  f"{monitor.peak_rss_mb:>12.0f} "
+                  f"{baseline if baseline is not None else float('nan'):>16.2f} "
+                  f"{recent if recent is not None else float('nan'):>14.2f}")
+        print(f"Browsers retired: {len(retirements)}")
+        for label, reason in retirements:
+            print(f"  - {label}: {reason}")
+
+
+class BrowserMonitor:
+    def __init__(self, policy, driver, label):
+        """Metrics of one browser from launch until it is retired"""
+        self.policy = policy
+        self.driver = driver
+        self.label = label
+        self.latencies = []  # Seconds per kWh step, one entry per country
+        self.rss_samples = []
+        self.peak_rss_mb = 0.0
+
+    def baseline_latency(self):
+        if len(self.latencies) < self.policy.baseline_countries:
+            return None
+        return statistics.median(self.latencies[:self.policy.baseline_countries])
+
+    def recent_latency(self):
+        if len(self.latencies) < self.policy.baseline_countries + self.policy.window:
+            return None
+        return statistics.median(self.latencies[-self.policy.window:])
+
+    def sample(self, seconds, steps):
+        """Record a country that took seconds for steps kWh values
+
+        Returns the reason to retire the browser, or None to keep it.
+        """
+        if steps:
+            self.latencies.append(seconds / steps)
+
+        rss_mb = browser_rss_mb(self.driver)
+        if rss_mb is not None:
+            self.rss_samples.append(rss_mb)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+            if rss_mb > self.policy.max_rss_mb:
+                return self.retire(f"RSS {rss_mb:.0f} MB over {self.policy.max_rss_mb} MB")
+
+        baseline = self.baseline_latency()
+        recent = self.recent_latency()
+        if baseline and recent and recent > baseline * self.policy.max_slowdown:
+            return self.retire(f"step latency {recent:.2f}s vs baseline {baseline:.2f}s")
+        return None
+
+    def retire(self, reason):
+        self.policy.retired(self, reason)
+        return reason
+
+
+def browser_rss_mb(driver):
+    """Resident memory of chromedriver and every process it started, in MB"""
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+
+    total = 0
+    for child in processes:
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
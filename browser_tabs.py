@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Multiple calculator tabs inside one Chrome process
+Each TabSession looks like a WebDriver to the scraper code, while the real
+driver is shared and switched to the right tab for every command
+"""
+import threading
+from selenium.webdriver.remote.webelement import WebElement
+
+# Keep background tabs running at full speed, otherwise Chrome throttles their timers
+BACKGROUND_TAB_ARGUMENTS = [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding"
+]
+
+
+class SharedBrowser:
+    def __init__(self, driver):
+        """Wrap a driver so several tabs can be driven from different threads"""
+        self.driver = driver
+        self.lock = threading.RLock()  # One WebDriver command at a time
+        self.active = None  # TabSession whose tab and frame are currently selected
+        self.sessions = []
+        self.switches = 0  # Tab switches performed, for tuning tabs per browser
+
+    def open_tabs(self, count):
+        """Open count tabs (reusing the initial one) and return a TabSession for each"""
+        with self.lock:
+            for i in range(count):
+                if i > 0 or self.sessions:
+                    self.driver.switch_to.new_window('tab')
+                session = TabSession(self, self.driver.current_window_handle)
+                self.sessions.append(session)
+                self.active = session
+        return self.sessions[-count:]
+
+    def close_session(self, session):
+        """Close one tab, and the whole browser once the last tab is closed"""
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+            if not self.sessions:
+                self.driver.quit()
+                return
+            try:
+                session.activate()
+                self.driver.close()
+            finally:
+                self.active = None
+
+
+class TabSession:
+    def __init__(self, browser, handle):
+        """Driver-like view of a single tab in a SharedBrowser"""
+        self.browser = browser
+        self.handle = handle
+        self.frames = []  # Frame references entered from the top-level document
+        self.switch_to = TabSwitchTo(self)
+
+    @property
+    def session_id(self):
+        return f"{self.browser.driver.session_id}:{self.handle}"
+
+    def activate(self):
+        """Select this tab and its frame, skipping the switch if it is already selected"""
+        if self.browser.active is self:
+            return
+        driver = self.browser.driver
+        driver.switch_to.window(self.handle)
+        for frame in self.frames:
+            driver.switch_to.frame(frame)
+        self.browser.active = self
+        self.browser.switches += 1
+
+    def call(self, method, *args, **kwargs):
+        """Run a driver or element method with this tab selected"""
+        with self.browser.lock:
+            self.activate()
+            result = method(*[unwrap(arg) for arg in args], **kwargs)
+        return self.wrap(result)
+
+    def wrap(self, value):
+        """Tie returned elements to this tab so their commands are switched too"""
+        if isinstance(value, WebElement):
+            return TabElement(self, value)
+        if isinstance(value, list):
+            return [self.wrap(item) for item in value]
+        return value
+
+    def quit(self):
+        """Close this tab rather than the shared browser"""
+        self.browser.close_session(self)
+
+    @property
+    def page_source(self):
+        return self.call(lambda: self.browser.driver.page_source)
+
+    @property
+    def current_url(self):
+        return self.call(lambda: self.browser.driver.current_url)
+
+    @property
+    def title(self):
+        return self.call(lambda: self.browser.driver.title)
+
+    def __getattr__(self, name):
+        value = getattr(self.browser.driver, name)
+        if callable(value):
+            return lambda *args, **kwargs: self.call(value, *args, **kwargs)
+        return value
+
+
+class TabSwitchTo:
+    def __init__(self, session):
+        """Frame switching that is remembered per tab"""
+        self.session = session
+
+    def frame(self, frame_reference):
+        raw = unwrap(frame_reference)
+        with self.session.browser.lock:
+            self.session.activate()
+            self.session.browser.driver.switch_to.frame(raw)
+            self.session.frames.append(raw)
+
+    def default_content(self):
+        with self.session.browser.lock:
+            self.session.activate()
+            self.session.browser.driver.switch_to.default_content()
+            self.session.frames = []
+
+    def parent_frame(self):
+        with self.session.browser.lock:
+            self.session.activate()
+            self.session.browser.driver.switch_to.parent_frame()
+            self.session.frames = self.session.frames[:-1]
+
+    @property
+    def active_element(self):
+        return self.session.call(lambda: self.session.browser.driver.switch_to.active_element)
+
+
+class TabElement:
+    def __init__(self, session, element):
+        """WebElement proxy that selects its tab before every command"""
+        self._session = session
+        self._element = element
+
+    def __getattr__(self, name):
+        # Properties such as text and tag_name issue a command when read
+        if isinstance(getattr(type(self._element), name, None), property):
+            return self._session.call(lambda: getattr(self._element, name))
+        value = getattr(self._element, name)
+        if callable(value):
+            return lambda *args, **kwargs: self._session.call(value, *args, **kwargs)
+        return value
+
+    def __eq__(self, other):
+        return unwrap(other) == self._element
+
+    def __hash__(self):
+        return hash(self._element)
+
+
+def unwrap(value):
+    """Return the real WebElement behind a TabElement"""
+    if isinstance(value, TabElement):
+        return value._element
+    return value
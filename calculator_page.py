@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Direct calculator loading
+The calculator lives in an iframe on the Terrapass marketing page. Its src is
+looked up once per process and every session then opens the calculator
+document as the top-level page, without the outer page or frame switching.
+Set CALCULATOR_PAGE_URL in the environment to use another page, e.g. the
+local fixture server
+"""
+import os
+import threading
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+CALCULATOR_PAGE_URL = os.environ.get("CALCULATOR_PAGE_URL", "https://terrapass.com/carbon-footprint-calculator/")
+
+_calculator_url = None
+_lock = threading.Lock()
+
+
+def calculator_url(driver, wait):
+    """Return the calculator iframe's src, loading the marketing page only the first time"""
+    global _calculator_url
+    with _lock:
+        if _calculator_url is None:
+            driver.get(CALCULATOR_PAGE_URL)
+            iframe = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "iframe.calculator")))
+            _calculator_url = wait.until(lambda d: iframe.get_attribute("src"))
+            print(f"Calculator URL: {_calculator_url}")
+        return _calculator_url
+
+
+def open_calculator(driver, wait):
+    """Load the calculator document as the top-level page"""
+    url = calculator_url(driver, wait)
+    driver.get(url)
+    return url
+
+
+def use_calculator_page(url):
+    """Point every session at another marketing page, e.g. a local stand-in"""
+    global CALCULATOR_PAGE_URL
+    CALCULATOR_PAGE_URL = url
+    forget_calculator_url()
+
+
+def forget_calculator_url():
+    """Drop the cached src, e.g. after the calculator has moved"""
+    global _calculator_url
+    with _lock:
+        _calculator_url = None
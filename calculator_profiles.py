@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Calculator profiles
+Everything that differs between calculator flows, described as data for the
+shared scraper engine: the clicks that lead to the section, the result
+selectors and the default kWh grid
+"""
+from dom_waits import ELECTRICITY_INPUT_SELECTORS
+
+
+class CalculatorProfile:
+    def __init__(self, name, navigation, result_xpaths, electricity_values,
+                 input_selectors=None, fallback_countries=None):
+        """Describe one calculator flow
+
+        navigation is a list of (page state, fallback XPaths) clicked in order
+        once the calculator has opened; the page state keys the selector cache.
+        result_xpaths are tried together, most specific first.
+        fallback_countries is used when the country dropdown cannot be read.
+        """
+        self.name = name
+        self.navigation = navigation
+        self.result_xpaths = list(result_xpaths)
+        self.electricity_values = list(electricity_values)
+        self.input_selectors = list(input_selectors or ELECTRICITY_INPUT_SELECTORS)
+        self.fallback_countries = fallback_countries
+
+
+INDIVIDUAL = CalculatorProfile(
+    name="individual",
+    navigation=[
+        ("individual", [
+            "//a[contains(text(), 'Individual Calculator')]",  # Prioritize link over button
+            "//button[contains(text(), 'Individual Calculator')]",
+            "//button[contains(text(), 'Individual')]",
+            "//div[contains(text(), 'Individual Calculator')]",
+            "//span[contains(text(), 'Individual Calculator')]",
+            "//input[@value='Individual Calculator']"
+        ]),
+        ("home_energy", [
+            "//a[contains(@class, 'ico-home')]",
+            "//a[contains(text(), 'Home Energy')]",
+            "//button[contains(text(), 'Home Energy')]",
+            "//div[contains(text(), 'Home Energy')]"
+        ])
+    ],
+    result_xpaths=[
+        "//*[contains(text(), 'Home Energy')]/following-sibling::*[contains(text(), 'lbs CO2e')]"
+    ],
+    electricity_values=[50, 100, 250, 500, 1000]
+)
+
+BUSINESS = CalculatorProfile(
+    name="business",
+    navigation=[
+        # The Business Calculator opens on the Business Site page (SITE type is default)
+        ("business", [
+            "//a[contains(text(), 'Business Calculator')]",
+            "//button[contains(text(), 'Business Calculator')]"
+        ])
+    ],
+    result_xpaths=[
+        "//*[contains(text(), 'Business Site')]/following-sibling::*[contains(text(), 'lbs CO2e')]",
+        "//*[contains(text(), 'lbs CO2e')]",
+        "//*[contains(text(), 'CO2e')]",
+        "//*[contains(text(), 'carbon')]",
+        "//*[contains(text(), 'footprint')]"
+    ],
+    electricity_values=[1000, 5000, 10000, 25000, 50000, 100000],
+    fallback_countries=["United States", "Albania", "Angola", "Argentina"]
+)
+
+PROFILES = {profile.name: profile for profile in (INDIVIDUAL, BUSINESS)}
@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""
+asyncio engine driving Chrome over the DevTools protocol
+One event loop drives many calculator pages at once, without a WebDriver
+or an OS thread per page. Every step is one in-page script that awaits DOM
+mutations, and results, checkpoints and output files are the same as the
+threaded engine's
+"""
+import asyncio
+import itertools
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import websockets
+import calculator_page
+from scraper_engine import CalculatorScraper, CHROME_BINARY, NEXT_SELECTORS, PREV_XPATH
+from calculator_profiles import PROFILES
+from browser_tabs import BACKGROUND_TAB_ARGUMENTS
+from js_step_executor import PAGE_HELPERS, KWH_STEP_SCRIPT, NEXT_XPATHS, PREV_XPATHS
+from emission_factors import probe_points, fit_factor, is_linear, fill_grid
+from results_sink import ResultsSink
+from step_timings import StepTimer
+
+CHROME_CANDIDATES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+
+CLICK_SCRIPT = """async ([xpaths, timeoutMs]) => {
+let stage = 'click';
+""" + PAGE_HELPERS + """
+const element = await waitFor(() => find(xpaths, usable));
+element.scrollIntoView(true);
+element.click();
+return true;
+}"""
+
+IFRAME_SRC_SCRIPT = """async ([timeoutMs]) => {
+let stage = 'calculator iframe';
+""" + PAGE_HELPERS + """
+const iframe = await waitFor(() => {
+    const frame = document.querySelector('iframe.calculator');
+    return frame && frame.src ? frame : null;
+});
+return iframe.src;
+}"""
+
+COUNTRY_OPTIONS_SCRIPT = """async ([timeoutMs]) => {
+let stage = 'country list';
+""" + PAGE_HELPERS + """
+const select = await waitFor(() => {
+    const dropdown = document.querySelector("select[name='country']");
+    return dropdown && dropdown.options.length > 1 ? dropdown : null;
+});
+return Array.from(select.options, option => option.text.trim()).filter(text => text !== 'Country');
+}"""
+
+SELECT_COUNTRY_SCRIPT = """async ([country, prevXPaths, timeoutMs, stateTimeoutMs]) => {
+let stage = 'prev';
+""" + PAGE_HELPERS + """
+const countrySelect = () => document.querySelector("select[name='country']");
+// Back to the country page from wherever the last country left off
+for (let attempt = 0; attempt < 3 && !countrySelect(); attempt++) {
+    const prev = await waitFor(() => find(prevXPaths, usable));
+    prev.click();
+    try { await waitFor(countrySelect); } catch (error) {}
+}
+
+stage = 'country select';
+let select;
+try {
+    select = await waitFor(() => {
+        const dropdown = countrySelect();
+        return dropdown && Array.from(dropdown.options).some(option => option.text.trim() === country) ? dropdown : null;
+    });
+} catch (error) {
+    return countrySelect() ? 'missing' : 'no_dropdown';
+}
+const option = Array.from(select.options).find(option => option.text.trim() === country);
+select.value = option.value;
+select.dispatchEvent(new Event('input', {bubbles: true}));
+select.dispatchEvent(new Event('change', {bubbles: true}));
+
+// Give a state dropdown a short window to populate
+stage = 'state check';
+try {
+    await waitFor(() => {
+        const dropdown = document.querySelector("select[name='state']");
+        return dropdown && dropdown.options.length > 1 ? dropdown : null;
+    }, stateTimeoutMs);
+    return 'states_required';
+} catch (error) {
+    return 'selected';
+}
+}"""
+
+# The batched kWh step, with the async script callback turned into a promise
+KWH_STEP_FUNCTION = """(args) => new Promise(done => (function () {
+""" + KWH_STEP_SCRIPT + """
+}).apply(null, [...args, done]))"""
+
+
+class CDPError(Exception):
+    """A DevTools command or in-page script failed"""
+
+
+class CDPConnection:
+    def __init__(self, websocket):
+        """One DevTools websocket; page sessions share it in flat mode"""
+        self.websocket = websocket
+        self.ids = itertools.count(1)
+        self.pending = {}  # command id -> future
+        self.listeners = {}  # session id -> callback(method, params)
+        self.reader = asyncio.ensure_future(self.read())
+
+    @classmethod
+    async def connect(cls, url):
+        return cls(await websockets.connect(url, max_size=None))
+
+    async def read(self):
+        try:
+            async for raw in self.websocket:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self.pending.pop(message["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message", str(message["error"]))))
+                    else:
+                        future.set_result(message.get("result", {}))
+                else:
+                    listener = self.listeners.get(message.get("sessionId"))
+                    if listener:
+                        listener(message.get("method"), message.get("params", {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("DevTools connection closed"))
+            self.pending.clear()
+
+    async def send(self, method, params=None, session_id=None):
+        if self.reader.done():
+            # Nothing would ever answer the command
+            raise CDPError("DevTools connection closed")
+        command_id = next(self.ids)
+        message = {"id": command_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command_id] = future
+        await self.websocket.send(json.dumps(message))
+        return await future
+
+    async def close(self):
+        await self.websocket.close()
+        await self.reader
+
+
+class CDPBrowser:
+    def __init__(self, process, connection, user_data_dir, cache_dir):
+        """A headless Chrome started for the engine"""
+        self.process = process
+        self.connection = connection
+        self.user_data_dir = user_data_dir
+        self.cache_dir = cache_dir
+        self.pages = []
+        self.replacement = None  # Browser started in place of this one after its connection was lost
+
+    @property
+    def connected(self):
+        return not self.connection.reader.done()
+
+    @classmethod
+    async def launch(cls, arguments, cache_dir=None, timeout=30):
+        """Start Chrome with remote debugging on a free port and connect to it"""
+        binary = CHROME_BINARY if CHROME_BINARY and os.path.exists(CHROME_BINARY) else None
+        binary = binary or next(filter(None, map(shutil.which, CHROME_CANDIDATES)), None)
+        if not binary:
+            raise CDPError("Chrome not found; set CHROME_BINARY")
+        user_data_dir = tempfile.mkdtemp(prefix="terrapass_cdp_")
+        process = await asyncio.create_subprocess_exec(
+            binary, "--headless=new", "--remote-debugging-port=0", f"--user-data-dir={user_data_dir}",
+            "--no-first-run", "--no-default-browser-check", *arguments, "about:blank",
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        # Chrome writes the port it picked and the browser endpoint to this file
+        port_file = os.path.join(user_data_dir, "DevToolsActivePort")
+        deadline = time.time() + timeout
+        while True:
+            if os.path.exists(port_file):
+                with open(port_file) as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    break
+            if process.returncode is not None or time.time() > deadline:
+                if process.returncode is None:
+                    process.kill()
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+                raise CDPError(f"Chrome did not start (exit code {process.returncode})")
+            await asyncio.sleep(0.1)
+
+        connection = await CDPConnection.connect(f"ws://127.0.0.1:{lines[0]}{lines[1]}")
+        return cls(process, connection, user_data_dir, cache_dir)
+
+    async def new_page(self):
+        target = await self.connection.send("Target.createTarget", {"url": "about:blank"})
+        session = await self.connection.send("Target.attachToTarget",
+                                             {"targetId": target["targetId"], "flatten": True})
+        page = CDPPage(self, target["targetId"], session["sessionId"])
+        self.connection.listeners[page.session_id] = page.on_event
+        await page.send("Page.enable")
+        await page.send("Network.enable")
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        try:
+            await asyncio.wait_for(self.connection.send("Browser.close"), timeout=5)
+        except Exception:
+            pass
+        try:
+            await self.connection.close()
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPPage:
+    def __init__(self, browser, target_id, session_id):
+        """One calculator page, attached over the browser's connection"""
+        self.browser = browser
+        self.target_id = target_id
+        self.session_id = session_id
+        self.loaded = asyncio.Event()
+        self.requests = set()  # Requests in flight
+        self.last_activity = time.monotonic()
+        self.last_result_text = None
+
+    def on_event(self, method, params):
+        if method == "Page.loadEventFired":
+            self.loaded.set()
+        elif method == "Network.requestWillBeSent":
+            self.requests.add(params.get("requestId"))
+            self.last_activity = time.monotonic()
+        elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+            self.requests.discard(params.get("requestId"))
+            self.last_activity = time.monotonic()
+
+    async def send(self, method, params=None):
+        return await self.browser.connection.send(method, params, self.session_id)
+
+    async def navigate(self, url, timeout=30):
+        self.loaded.clear()
+        result = await self.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise CDPError(f"Could not load {url}: {result['errorText']}")
+        await asyncio.wait_for(self.loaded.wait(), timeout)
+
+    async def network_idle(self, idle=0.3, timeout=10):
+        """Wait until no request has started or finished for idle seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            quiet = time.monotonic() - self.last_activity
+            if not self.requests and quiet >= idle:
+                return True
+            await asyncio.sleep(max(0.05, idle - quiet) if not self.requests else 0.05)
+        return False
+
+    async def call(self, function, *args):
+        """Run an in-page function with JSON arguments and return its (awaited) value"""
+        result = await self.send("Runtime.evaluate", {
+            "expression": f"({function})({json.dumps(list(args))})",
+            "awaitPromise": True,
+            "returnByValue": True
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise CDPError(description.splitlines()[0] if description else "Script failed")
+        return result["result"].get("value")
+
+    async def close(self):
+        try:
+            await self.browser.connection.send("Target.closeTarget", {"targetId": self.target_id})
+        except Exception:
+            pass
+
+
+class AsyncCalculatorScraper(CalculatorScraper):
+    def __init__(self, profile, output_prefix=None, state_check_timeout=0.5, probe_mode=False,
+                 network_policy=None, rate_limiter=None, step_timeout=5):
+        """Initialize an asyncio scraper for one calculator profile
+
+        step_timeout applies to each in-page wait, like the WebDriver waits
+        of the threaded engine.
+        """
+        super().__init__(profile, output_prefix or f"cdp_{profile.name}", state_check_timeout=state_check_timeout,
+                         probe_mode=probe_mode, network_policy=network_policy, rate_limiter=rate_limiter)
+        self.step_timeout = step_timeout
+        self.timeout_ms = int(step_timeout * 1000)
+        self.browsers = []
+        self.calculator_document = None  # The calculator iframe's src, looked up once per run
+        self.lookup_lock = None
+        self.relaunch_lock = None
+
+    def chrome_arguments(self, cache_dir):
+        arguments = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--disable-extensions",
+                     "--disable-plugins", "--mute-audio"] + BACKGROUND_TAB_ARGUMENTS
+        return arguments + self.network_policy.chrome_arguments(cache_dir)
+
+    async def launch_browser(self):
+        cache_dir = self.network_policy.lease_cache_dir()
+        with self.timer.measure("driver_start"):
+            try:
+                browser = await CDPBrowser.launch(self.chrome_arguments(cache_dir), cache_dir)
+            except Exception:
+                self.network_policy.release_cache_dir(cache_dir)
+                raise
+        if cache_dir:
+            self.network_policy.bind_cache_dir(cache_dir, browser.process.pid)
+        self.browsers.append(browser)
+        return browser
+
+    async def open_page(self, browser, label):
+        """Open a page with request blocking on and navigate it into the calculator"""
+        page = await browser.new_page()
+        await page.send("Network.setBlockedURLs", {"urls": self.network_policy.blocked_patterns})
+        start_time = time.time()
+        with self.timer.measure("navigate"):
+            await self.open_calculator(page)
+        print(f"[{label}] Calculator ready in {time.time() - start_time:.1f}s")
+        return page
+
+    async def recover_page(self, page, tab_id):
+        """A working calculator page after an error: the same page reloaded, or a new one
+
+        A page whose browser lost its DevTools connection moves to a new
+        browser, started once for all the pages of the lost one.
+        """
+        try:
+            await self.open_calculator(page)
+            return page
+        except Exception as e:
+            print(f"[Page {tab_id}] Failed to reload the calculator ({e}), opening a new page")
+        await page.close()
+        browser = page.browser
+        async with self.relaunch_lock:
+            while not browser.connected:
+                if browser.replacement is None:
+                    print(f"[Page {tab_id}] Browser connection lost, starting a new browser")
+                    browser.replacement = await self.launch_browser()
+                browser = browser.replacement
+        return await self.open_page(browser, f"Page {tab_id}")
+
+    async def open_calculator(self, page):
+        """Load the calculator document directly and click through the profile's navigation"""
+        async with self.lookup_lock:
+            if self.calculator_document is None:
+                await self.rate_limiter.acquire_async("page_load")
+                await page.navigate(calculator_page.CALCULATOR_PAGE_URL)
+                self.calculator_document = await page.call(IFRAME_SRC_SCRIPT, self.timeout_ms)
+                print(f"Calculator URL: {self.calculator_document}")
+
+        await self.rate_limiter.acquire_async("page_load")
+        await page.navigate(self.calculator_document)
+        await page.network_idle()
+        for state, selectors in self.profile.navigation:
+            try:
+                await page.call(CLICK_SCRIPT, selectors, self.timeout_ms)
+            except CDPError:
+                # Continue anyway, maybe we're already in the right section
+                print(f"Could not find the '{state}' button")
+                break
+        return await page.call(COUNTRY_OPTIONS_SCRIPT, self.timeout_ms)
+
+    async def click_next(self, page):
+        await self.rate_limiter.acquire_async("next")
+        with self.timer.measure("click_next"):
+            try:
+                return await page.call(CLICK_SCRIPT, NEXT_SELECTORS, self.timeout_ms)
+            except CDPError:
+                return False
+
+    async def test_country(self, country_name, electricity_values, page, tab_id):
+        """Select a country and measure its kWh grid; None when there is nothing to measure"""
+        print(f"[Page {tab_id}] Testing country: {country_name}")
+        with self.timer.measure("country_select") as step:
+            outcome = await page.call(SELECT_COUNTRY_SCRIPT, country_name, [PREV_XPATH], self.timeout_ms,
+                                      int(self.state_check_timeout * 1000))
+            step.timeout = outcome == "no_dropdown"
+        if outcome in ("missing", "no_dropdown"):
+            print(f"[Page {tab_id}] Country '{country_name}' not found in dropdown")
+            return None
+        if outcome == "states_required":
+            print(f"[Page {tab_id}] Country {country_name} requires state selection")
+            if country_name not in self.states_required_countries:
+                self.states_required_countries.append(country_name)
+            if self.journal:
+                self.journal.record_states_required(country_name)
+            return None
+
+        if not await self.click_next(page):
+            return None
+        return await self.measure_country_async(country_name, electricity_values, page, tab_id)
+
+    async def measure_kwh_values_async(self, country_name, kwh_values, page, tab_id):
+        """Measure each kWh value with one in-page script per value"""
+        country_results = {}
+        result_xpaths = self.selector_cache.ordered("result", self.profile.result_xpaths)
+        for kwh in kwh_values:
+            print(f"[Page {tab_id}]   Testing {kwh} kWh...")
+            await self.rate_limiter.acquire_async("next")
+            start_time = time.perf_counter()
+            with self.timer.measure("kwh_step") as timed:
+                step = await page.call(KWH_STEP_FUNCTION, [kwh, self.profile.input_selectors, NEXT_XPATHS,
+                                                           result_xpaths, PREV_XPATHS, page.last_result_text,
+                                                           self.timeout_ms]) or {}
+                timed.timeout = "timed out" in (step.get("error") or "")
+
+            if step.get("text"):
+                page.last_result_text = step["text"]
+            if step.get("value") is not None:
+                self.timer.record("measurement", time.perf_counter() - start_time)
+                country_results[kwh] = step["value"]
+                print(f"[Page {tab_id}]     Result: {step['value']} lbs CO2e")
+                self.record_result(country_name, kwh, step["value"])
+            else:
+                print(f"[Page {tab_id}]     No result found ({step.get('error')})")
+
+            if not step.get("ok") and step.get("stage") in ("result", "prev"):
+                # Back to the energy page for the next value
+                try:
+                    with self.timer.measure("prev"):
+                        await page.call(CLICK_SCRIPT, PREV_XPATHS, self.timeout_ms)
+                except CDPError:
+                    break
+        return country_results
+
+    async def measure_country_async(self, country_name, electricity_values, page, tab_id):
+        """measure_country for the asyncio engine, including probe mode"""
+        if not self.probe_mode:
+            return await self.measure_kwh_values_async(country_name, electricity_values, page, tab_id)
+
+        measured = await self.measure_kwh_values_async(country_name, probe_points(electricity_values), page, tab_id)
+        factor = fit_factor(measured)
+        if len(measured) == 2 and is_linear(measured, factor):
+            self.emission_factors[country_name] = factor
+            print(f"[Page {tab_id}]   {country_name}: {factor:.6f} lbs CO2e/kWh, derived {len(electricity_values) - len(measured)} values")
+            country_results = fill_grid(factor, electricity_values, measured)
+            if self.journal:
+                self.journal.record_factor(country_name, factor)
+            for kwh, value in country_results.items():
+                if kwh not in measured:
+                    self.record_result(country_name, kwh, value)
+            return country_results
+
+        print(f"[Page {tab_id}]   {country_name} could not be confirmed linear, running full sweep")
+        remaining = [kwh for kwh in electricity_values if kwh not in measured]
+        measured.update(await self.measure_kwh_values_async(country_name, remaining, page, tab_id))
+        return {kwh: measured[kwh] for kwh in electricity_values if kwh in measured}
+
+    async def worker_page(self, page, work_queue, electricity_values, tab_id, attempts, max_retries, failed):
+        """Worker coroutine for one page, pulling countries from the shared queue
+
+        Any error fails the country through the retry budget and gets the
+        page back into the calculator; the worker only stops if that fails.
+        """
+        self.timer.set_tab(tab_id)
+        completed = 0
+        while True:
+            country = await work_queue.get()
+            attempts[country] = attempts.get(country, 0) + 1
+            try:
+                print(f"[Page {tab_id}] Processing {country} ({work_queue.qsize()} left in queue)")
+                start_time = time.time()
+                results = None
+                broken = False
+                try:
+                    results = await self.test_country(country, self.missing_kwh_values(country, electricity_values),
+                                                      page, tab_id)
+                except Exception as e:
+                    print(f"[Page {tab_id}] Error processing {country}: {e}")
+                    self.timer.count("error")
+                    broken = True
+
+                if results:
+                    merged = dict(self.results.get(country, {}))
+                    merged.update(results)
+                    self.results[country] = {kwh: merged[kwh] for kwh in sorted(merged)}
+                    completed += 1
+                elif country in self.states_required_countries:
+                    pass
+                elif attempts[country] <= max_retries:
+                    self.timer.count("retry")
+                    print(f"[Page {tab_id}] No results for {country}, re-queued for retry")
+                    work_queue.put_nowait(country)
+                else:
+                    print(f"[Page {tab_id}] Giving up on {country} after {max_retries} retries")
+                    failed.append(country)
+                print(f"[Page {tab_id}] {country} took {time.time() - start_time:.1f}s ({completed} done)")
+
+                if broken:
+                    # The country is already re-queued or failed if this raises
+                    page = await self.recover_page(page, tab_id)
+            finally:
+                work_queue.task_done()
+
+    async def run_async(self, electricity_values=None, num_tabs=20, max_retries=2, tabs_per_browser=10,
+                        checkpoint_file=None, countries=None, results_file=None, country_limit=None):
+        """Run num_tabs pages across browsers of tabs_per_browser pages each; see run"""
+        electricity_values = electricity_values or self.profile.electricity_values
+        self.electricity_values = list(electricity_values)
+        self.timer = StepTimer()
+        self.timings_file = f"{self.output_prefix}_timings.json"
+        self.lookup_lock = asyncio.Lock()
+        self.relaunch_lock = asyncio.Lock()
+        self.calculator_document = None
+        workers = []
+        finished = None
+
+        try:
+            all_countries = self.resume_from_checkpoint(checkpoint_file)
+            if countries is not None:
+                all_countries = list(countries)
+
+            browser_count = math.ceil(num_tabs / tabs_per_browser)
+            browsers = await asyncio.gather(*(self.launch_browser() for _ in range(browser_count)))
+
+            if all_countries is None:
+                page = await browsers[0].new_page()
+                try:
+                    all_countries = await self.open_calculator(page)
+                    print(f"Found {len(all_countries)} countries")
+                    if self.journal:
+                        self.journal.record_countries(all_countries)
+                except (CDPError, asyncio.TimeoutError) as e:
+                    print(f"Error getting country list: {e}")
+                    if not self.profile.fallback_countries:
+                        raise
+                    all_countries = list(self.profile.fallback_countries)
+                    print(f"Using fallback list: {all_countries}")
+                finally:
+                    await page.close()
+            if country_limit:
+                all_countries = all_countries[:country_limit]
+
+            self.results_file = results_file or f"{self.output_prefix}_results_rows.csv"
+            self.sink = ResultsSink(self.results_file, append=False)
+            for country, country_results in self.results.items():
+                self.sink.write_many(country, country_results)
+
+            pending = [country for country in all_countries
+                       if country not in self.states_required_countries
+                       and self.missing_kwh_values(country, electricity_values)]
+            if not pending:
+                print("All countries are already complete, nothing to do")
+                return
+            num_tabs = min(num_tabs, len(pending))
+
+            work_queue = asyncio.Queue()
+            for country in pending:
+                work_queue.put_nowait(country)
+            print(f"Queued {len(pending)} of {len(all_countries)} countries for {num_tabs} pages "
+                  f"in {browser_count} browsers")
+
+            opened = await asyncio.gather(
+                *(self.open_page(browsers[i // tabs_per_browser], f"Page {i + 1}") for i in range(num_tabs)),
+                return_exceptions=True
+            )
+            pages = [page for page in opened if isinstance(page, CDPPage)]
+            for error in opened:
+                if not isinstance(error, CDPPage):
+                    print(f"Could not open a calculator page: {error}")
+            if not pages:
+                raise CDPError("No calculator page could be opened")
+
+            attempts, failed = {}, []
+            workers = [asyncio.ensure_future(self.worker_page(page, work_queue, electricity_values, i + 1,
+                                                              attempts, max_retries, failed))
+                       for i, page in enumerate(pages)]
+            # Workers only return by failing, so wait on them too or a dead pool would never finish the queue
+            finished = asyncio.ensure_future(work_queue.join())
+            running = set(workers)
+            while not finished.done():
+                done, running = await asyncio.wait(running | {finished}, return_when=asyncio.FIRST_COMPLETED)
+                running.discard(finished)
+                for worker in done - {finished}:
+                    print(f"A page stopped after an error it could not recover from: {worker.exception()}")
+                if running or finished.done():
+                    continue
+                while not work_queue.empty():
+                    failed.append(work_queue.get_nowait())
+                    work_queue.task_done()
+                print("No pages left to work on the queue")
+                break
+
+            if failed:
+                print(f"Countries that failed after all retries: {', '.join(failed)}")
+            print("All pages completed!")
+
+        finally:
+            if finished:
+                finished.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*(browser.close() for browser in self.browsers), return_exceptions=True)
+            for browser in self.browsers:
+                if browser.cache_dir:
+                    self.network_policy.release_cache_dir(browser.cache_dir)
+            self.browsers = []
+            self.network_policy.report()
+            self.rate_limiter.report()
+            self.timer.report(self.timings_file)
+            if self.sink:
+                self.sink.close()
+            if self.journal:
+                self.journal.close()
+
+    def run(self, electricity_values=None, num_tabs=20, max_retries=2, tabs_per_browser=10,
+            checkpoint_file=None, countries=None, results_file=None, country_limit=None):
+        """Run the analysis on one event loop
+
+        Same options, results and output files as CalculatorScraper.run, with
+        num_tabs pages spread over browsers of tabs_per_browser pages each.
+        """
+        asyncio.run(self.run_async(electricity_values, num_tabs, max_retries, tabs_per_browser,
+                                   checkpoint_file, countries, results_file, country_limit))
+
+
+def main():
+    """Run the asyncio engine: python cdp_engine.py [individual|business] [pages]"""
+    profile = PROFILES[sys.argv[1]] if len(sys.argv) > 1 and sys.argv[1] in PROFILES else PROFILES["individual"]
+    num_tabs = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    scraper = AsyncCalculatorScraper(profile)
+    scraper.run(num_tabs=num_tabs, checkpoint_file=f"cdp_{profile.name}_checkpoint.jsonl")
+    scraper.save_final_results()
+    scraper.print_summary(f"ASYNC CDP {profile.name.upper()} ANALYSIS SUMMARY",
+                          f"states_required_countries_cdp_{profile.name}.txt")
+
+
+if __name__ == "__main__":
+    main()
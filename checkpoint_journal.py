@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal for scraper runs
+One JSON line per event, so an interrupted run can resume only the missing work
+"""
+import json
+import os
+import threading
+from regions import region_key, split_region
+
+
+class CheckpointJournal:
+    def __init__(self, filename):
+        """Open (or create) the journal file in append mode"""
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.file = open(filename, "a")
+
+        # Terminate a line cut short by a crash so the next entry starts cleanly
+        if self.file.tell() > 0:
+            with open(filename, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def load(self):
+        """Replay the journal into {"countries", "results", "states_required", "factors", "states"}
+
+        results and factors are keyed by region; states maps each country
+        swept by state to its state options. A line cut short by a crash is
+        skipped.
+        """
+        state = {"countries": None, "results": {}, "states_required": [], "factors": {}, "states": {}}
+        if not os.path.exists(self.filename):
+            return state
+
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                kind = entry.get("type")
+                if kind == "countries":
+                    state["countries"] = entry["countries"]
+                elif kind == "result":
+                    region = region_key(entry["country"], entry.get("state"))
+                    state["results"].setdefault(region, {})[entry["kwh"]] = entry["value"]
+                elif kind == "states_required":
+                    if entry["country"] not in state["states_required"]:
+                        state["states_required"].append(entry["country"])
+                elif kind == "factor":
+                    state["factors"][region_key(entry["country"], entry.get("state"))] = entry["factor"]
+                elif kind == "states":
+                    state["states"][entry["country"]] = entry["states"]
+        return state
+
+    def append(self, entry):
+        """Write one entry and flush it to disk before returning"""
+        line = json.dumps(entry)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record_countries(self, countries):
+        """Remember the country list so a resumed run does not have to fetch it again"""
+        self.append({"type": "countries", "countries": list(countries)})
+
+    def record_result(self, region, kwh, value):
+        self.append(self.region_entry("result", region, kwh=kwh, value=value))
+
+    def record_states_required(self, country):
+        self.append({"type": "states_required", "country": country})
+
+    def record_states(self, country, states):
+        """Remember the state options of a country that is swept by state"""
+        self.append({"type": "states", "country": country, "states": list(states)})
+
+    def record_factor(self, region, factor):
+        self.append(self.region_entry("factor", region, factor=factor))
+
+    def region_entry(self, kind, region, **fields):
+        country, state = split_region(region)
+        entry = {"type": kind, "country": country}
+        if state:
+            entry["state"] = state
+        entry.update(fields)
+        return entry
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Adaptive concurrency for the multi-tab scrapers
+Starts with a few workers and adds one at a time while throughput keeps
+rising, backing off when latency, failures or host CPU/memory spike
+"""
+import threading
+import time
+import psutil
+
+
+def cpu_busy_percent(start, end):
+    """Host CPU use between two psutil.cpu_times() readings"""
+    def totals(times):
+        # Guest time is already counted in user time
+        total = sum(times) - getattr(times, "guest", 0) - getattr(times, "guest_nice", 0)
+        return total, times.idle + getattr(times, "iowait", 0)
+
+    start_total, start_idle = totals(start)
+    end_total, end_idle = totals(end)
+    if end_total <= start_total:
+        return 0.0
+    return 100.0 * (1 - (end_idle - start_idle) / (end_total - start_total))
+
+
+class ConcurrencyController:
+    def __init__(self, initial=2, minimum=1, maximum=20, interval=30, min_samples=3, min_gain=0.1,
+                 max_error_rate=0.2, max_slowdown=1.5, max_cpu_percent=90, max_memory_percent=85,
+                 recover_after=3):
+        """Limits and thresholds for sizing the worker pool
+
+        Every interval seconds, once at least min_samples countries finished
+        at the current level, one worker is added if throughput rose by more
+        than min_gain over the previous level, and one is removed if the error
+        rate, the per-step latency against the best level (max_slowdown) or
+        host CPU/memory usage crosses its threshold. CPU is averaged over the
+        whole interval. A back-off caps the worker count below the level that
+        failed; the cap goes up by one again after recover_after healthy
+        intervals.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = max(minimum, min(initial, maximum))
+        self.interval = interval
+        self.min_samples = min_samples
+        self.min_gain = min_gain
+        self.max_error_rate = max_error_rate
+        self.max_slowdown = max_slowdown
+        self.max_cpu_percent = max_cpu_percent
+        self.max_memory_percent = max_memory_percent
+        self.lock = threading.Lock()
+        self.ceiling = maximum  # Lowered after a back-off so the controller does not retry a bad level right away
+        self.recover_after = recover_after
+        self.healthy_windows = 0  # Intervals in a row without a back-off
+        self.recovering = False  # Whether the limit from a back-off is still being raised again
+        self.probing = False  # Whether the last interval tried a level above a raised limit
+        self.best_latency = None  # Lowest seconds per step seen at any level
+        self.last_throughput = None  # Countries per minute at the previous level
+        self.settled = None
+        self.history = []  # (elapsed seconds, workers, reason)
+        self.started = time.time()
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_start = time.time()
+        self.window_cpu = psutil.cpu_times()
+        self.succeeded = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.steps = 0
+
+    def limit(self, maximum):
+        """Cap the worker count, e.g. at the number of queued countries"""
+        with self.lock:
+            self.maximum = max(self.minimum, min(self.maximum, maximum))
+            self.ceiling = min(self.ceiling, self.maximum)
+            self.target = min(self.target, self.maximum)
+
+    def admit(self, tab_id):
+        """Whether worker tab_id (1-based) should take another country"""
+        return tab_id <= self.target
+
+    def record(self, seconds, steps, ok):
+        """Outcome of one country: time spent, kWh values measured and success"""
+        with self.lock:
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self.busy_time += seconds
+            self.steps += steps
+
+    def adjust(self):
+        """Re-evaluate the worker count; returns the new target"""
+        with self.lock:
+            elapsed = time.time() - self.window_start
+            if elapsed < self.interval:
+                return self.target
+            # Over the whole interval, so a short spike such as a Chrome launch does not count
+            cpu = cpu_busy_percent(self.window_cpu, psutil.cpu_times())
+            memory = psutil.virtual_memory().percent
+            finished = self.succeeded + self.failed
+            saturated = cpu > self.max_cpu_percent or memory > self.max_memory_percent
+            if finished < self.min_samples and not saturated:
+                return self.target
+
+            throughput = self.succeeded / elapsed * 60
+            error_rate = self.failed / finished if finished else 0.0
+            latency = self.busy_time / self.steps if self.steps else None
+            slowdown = latency / self.best_latency if latency and self.best_latency else 1.0
+            stats = (f"{throughput:.1f} countries/min, {error_rate:.0%} errors, "
+                     f"{latency or 0:.2f}s/step, CPU {cpu:.0f}%, memory {memory:.0f}%")
+
+            if not (saturated or error_rate > self.max_error_rate or slowdown > self.max_slowdown):
+                self.healthy_windows += 1
+            probing, self.probing = self.probing, False
+            if saturated:
+                self.back_off(f"host saturated ({stats})")
+            elif error_rate > self.max_error_rate:
+                self.back_off(f"error rate {error_rate:.0%} ({stats})")
+            elif slowdown > self.max_slowdown:
+                self.back_off(f"latency {slowdown:.1f}x the best level ({stats})")
+            elif self.recovering and self.ceiling < self.maximum and self.healthy_windows >= self.recover_after:
+                # A back-off only holds for a while, then the level above is tried again
+                self.ceiling += 1
+                self.healthy_windows = 0
+                self.settled = None
+                self.probing = True
+                self.change(min(self.target + 1, self.ceiling),
+                            f"limit raised to {self.ceiling} after {self.recover_after} healthy intervals ({stats})")
+            elif self.last_throughput is not None and throughput <= self.last_throughput * (1 + self.min_gain):
+                # More workers stopped paying off
+                if probing:
+                    # Not the back-off that was holding the level down
+                    self.recovering = False
+                if self.settled != self.target:
+                    self.settled = self.target
+                    self.change(self.target, f"throughput flat, settled ({stats})")
+            elif self.target < self.ceiling:
+                self.change(self.target + 1, f"throughput rising ({stats})")
+            elif self.settled != self.target:
+                self.settled = self.target
+                self.change(self.target, f"at the limit of {self.ceiling}, settled ({stats})")
+
+            if latency and (self.best_latency is None or latency < self.best_latency):
+                self.best_latency = latency
+            self.last_throughput = throughput
+            self.reset_window()
+            return self.target
+
+    def back_off(self, reason):
+        self.ceiling = max(self.minimum, self.target - 1)
+        self.healthy_windows = 0
+        self.recovering = True
+        self.settled = None
+        self.change(self.ceiling, reason)
+
+    def change(self, target, reason):
+        if target != self.target:
+            print(f"[Concurrency] {self.target} -> {target} workers: {reason}")
+        else:
+            print(f"[Concurrency] Staying at {target} workers: {reason}")
+        self.target = target
+        self.history.append((time.time() - self.started, target, reason))
+
+    def report(self):
+        """Print the concurrency the run settled on and how it got there"""
+        peak = max([workers for _, workers, _ in self.history] + [self.target])
+        settled = self.settled if self.settled is not None else self.target
+        print(f"\nConcurrency settled at {settled} workers (peak {peak}, limit {self.maximum}, "
+              f"{len(self.history)} adjustments)")
+        for elapsed, workers, reason in self.history:
+            print(f"  {elapsed:>6.0f}s  {workers:>3} workers  {reason}")
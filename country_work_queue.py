@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Shared work queue for the multi-tab scrapers
+Tabs pull countries one at a time instead of owning a fixed slice
+"""
+import threading
+from collections import deque
+
+
+class CountryWorkQueue:
+    def __init__(self, items=None, max_retries=2):
+        """Initialize the queue with the items to process"""
+        self.max_retries = max_retries
+        self.pending = deque()
+        self.attempts = {}  # Attempts made so far per item
+        self.in_flight = 0  # Items handed out but not yet finished
+        self.failed = []  # Items that used up their retry budget
+        self.completed = 0
+        self.condition = threading.Condition()
+
+        for item in items or []:
+            self.put(item)
+
+    def put(self, item):
+        """Add a new item to the back of the queue"""
+        with self.condition:
+            self.attempts.setdefault(item, 0)
+            self.pending.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Take the next item, or return None once all work is finished
+
+        Blocks while the queue is empty but other tabs still hold items,
+        since a failing item may come back for a retry.
+        """
+        with self.condition:
+            while not self.pending:
+                if self.in_flight == 0:
+                    return None
+                if not self.condition.wait(timeout):
+                    return None
+            item = self.pending.popleft()
+            self.attempts[item] += 1
+            self.in_flight += 1
+            return item
+
+    def done(self, item):
+        """Mark an item as successfully processed"""
+        with self.condition:
+            self.in_flight -= 1
+            self.completed += 1
+            self.condition.notify_all()
+
+    def retry(self, item):
+        """Put a failed item back on the queue if it has retries left
+
+        Returns True when the item was re-queued.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            requeued = self.attempts[item] <= self.max_retries
+            if requeued:
+                self.pending.append(item)
+            else:
+                self.failed.append(item)
+            self.condition.notify_all()
+            return requeued
+
+    def kwh_values(self, item, electricity_values):
+        """kWh values this queue hands out for an item; all of them for a local queue"""
+        return electricity_values
+
+    def remaining(self):
+        """Number of items still waiting to be handed out"""
+        with self.condition:
+            return len(self.pending)
+
+    def __len__(self):
+        return self.remaining()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Distributed scraping over a shared job store
+Nodes lease a country's open (calculator, country, kWh) jobs at a time and
+run the usual worker_tab threads on them, writing each result back to the
+store. Start as many nodes as there are machines to scale the run
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from scraper_engine import CalculatorScraper
+from calculator_profiles import PROFILES
+from browser_recycling import RecyclePolicy
+from job_store import JobStoreServer, SQLiteJobStore, open_job_store
+from results_sink import ResultsSink, export_results
+
+
+class StoreWorkQueue:
+    def __init__(self, store, calculator, node_id, max_retries=2, poll_interval=5):
+        """The CountryWorkQueue interface worker_tab expects, backed by the job store
+
+        Every worker thread leases under its own owner name, so a country is
+        only ever held by one tab.
+        """
+        self.store = store
+        self.calculator = calculator
+        self.node_id = node_id
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval  # How often to look for re-queued jobs while other nodes hold leases
+        self.scraper = None
+        self.leases = {}  # owner -> (country, leased kWh values)
+
+    def owner(self):
+        return f"{self.node_id}/{threading.current_thread().name}"
+
+    def get(self, timeout=None):
+        """Lease the next country, or return None once no job is pending or leased anywhere"""
+        while True:
+            job = self.store.lease(self.calculator, self.owner(), self.max_retries)
+            if job:
+                # Values finished elsewhere are not measured again
+                with self.scraper.lock:
+                    self.scraper.results[job["country"]] = {kwh: value for kwh, value in job["done"]}
+                self.leases[self.owner()] = (job["country"], set(job["kwh"]))
+                return job["country"]
+            counts = self.store.counts(self.calculator)
+            if not counts.get("leased"):
+                return None
+            # Another node holds the rest; its leases come back here if it dies
+            time.sleep(self.poll_interval)
+
+    def kwh_values(self, country, electricity_values):
+        """Only the values this tab leased, not ones that failed or another node holds"""
+        leased_country, leased = self.leases.get(self.owner(), (None, set()))
+        if leased_country != country:
+            return []
+        return [kwh for kwh in electricity_values if kwh in leased]
+
+    def done(self, country):
+        # kWh values the country did not produce go back to the queue
+        self.store.release(self.calculator, country, self.owner(), self.max_retries)
+
+    def retry(self, country):
+        return self.store.release(self.calculator, country, self.owner(), self.max_retries) > 0
+
+    def remaining(self):
+        return self.store.counts(self.calculator).get("pending", 0)
+
+
+class StoreJournal:
+    def __init__(self, store, calculator, work_queue):
+        """Journal interface that writes results straight to the job store
+
+        Results are written under the calling tab's lease owner, so a tab
+        whose lease expired cannot overwrite the node that took it over.
+        """
+        self.store = store
+        self.calculator = calculator
+        self.work_queue = work_queue
+
+    def record_result(self, country, kwh, value):
+        if not self.store.complete(self.calculator, country, kwh, value, self.work_queue.owner()):
+            print(f"[{self.work_queue.owner()}] Lease on {country} was lost, dropped its {kwh} kWh result")
+
+    def record_states_required(self, country):
+        self.store.mark_states_required(self.calculator, country)
+
+    def record_factor(self, country, factor):
+        pass
+
+    def record_countries(self, countries):
+        pass
+
+    def close(self):
+        pass
+
+
+def seed_jobs(store, scraper, countries=None, electricity_values=None):
+    """Queue the profile's kWh grid for every country, reading the country list if none is given"""
+    countries = countries or scraper.get_country_list()
+    electricity_values = electricity_values or scraper.profile.electricity_values
+    added = store.add_jobs(scraper.profile.name, countries, electricity_values)
+    print(f"Queued {added} new jobs for {len(countries)} countries x {len(electricity_values)} kWh values")
+    return added
+
+
+def run_node(scraper, store, num_tabs=4, node_id=None, max_retries=2):
+    """Run num_tabs worker tabs on this machine until the store has no open jobs"""
+    calculator = scraper.profile.name
+    node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+    electricity_values = store.kwh_values(calculator)
+    if not electricity_values:
+        print(f"No jobs for the {calculator} calculator in the store")
+        return
+
+    print(f"[Node {node_id}] Working on {calculator} jobs with {num_tabs} tabs: {store.counts(calculator)}")
+    work_queue = StoreWorkQueue(store, calculator, node_id, max_retries=max_retries)
+    work_queue.scraper = scraper
+    scraper.journal = StoreJournal(store, calculator, work_queue)
+    scraper.recycle_policy = scraper.recycle_policy or RecyclePolicy()
+    try:
+        scraper.run_workers(work_queue, electricity_values, num_tabs, 1)
+    finally:
+        scraper.recycle_policy.report()
+        scraper.network_policy.report()
+        scraper.rate_limiter.report()
+        scraper.timer.report(f"{scraper.output_prefix}_{node_id}_timings.json")
+        scraper.journal = None
+    print(f"[Node {node_id}] No open jobs left: {store.counts(calculator)}")
+
+
+def export_store(store, calculator, filename):
+    """Write the store's results to a rows file and export it to Excel and CSV"""
+    rows_file = filename.rsplit(".", 1)[0] + "_rows.csv"
+    sink = ResultsSink(rows_file, append=False)
+    for country, kwh, value in store.results(calculator):
+        sink.write(country, kwh, value)
+    sink.close()
+    export_results(rows_file, filename, store.kwh_values(calculator))
+    states_required = store.states_required(calculator)
+    if states_required:
+        print(f"Countries requiring state selection: {', '.join(states_required)}")
+
+
+def main():
+    """Coordinator and node commands:
+
+    serve <jobs.db> [port]                     run the HTTP coordinator
+    seed <store> <calculator> [country ...]    queue jobs (reads the country list if none given)
+    node <store> <calculator> [tabs]           work on jobs until none are open
+    export <store> <calculator> [file.xlsx]    export the finished jobs
+    <store> is a SQLite path on a shared volume or the coordinator's http:// URL.
+    """
+    if len(sys.argv) < 3 or sys.argv[1] not in ("serve", "seed", "node", "export"):
+        print(main.__doc__)
+        return
+
+    command = sys.argv[1]
+    if command == "serve":
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+        JobStoreServer(SQLiteJobStore(sys.argv[2]), port=port).serve_forever()
+        return
+
+    if len(sys.argv) < 4 or sys.argv[3] not in PROFILES:
+        print(f"Calculator must be one of: {', '.join(PROFILES)}")
+        return
+    store = open_job_store(sys.argv[2])
+    calculator = sys.argv[3]
+    extra = sys.argv[4:]
+
+    if command == "export":
+        export_store(store, calculator, extra[0] if extra else f"distributed_{calculator}_results.xlsx")
+        return
+
+    scraper = CalculatorScraper(PROFILES[calculator], output_prefix=f"distributed_{calculator}")
+    if command == "seed":
+        seed_jobs(store, scraper, countries=extra or None)
+    else:
+        run_node(scraper, store, num_tabs=int(extra[0]) if extra else 4)
+
+
+if __name__ == "__main__":
+    main()
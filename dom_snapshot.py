@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+One-call DOM snapshots
+Pulls the calculator document in a single execute_script call and answers
+lookups (inputs, dropdown options, result text) locally with lxml, instead of
+a WebDriver round-trip per element and property. Only the element that is
+finally clicked or typed into is fetched back from the browser
+"""
+import re
+import lxml.html
+
+# Serializes a copy of the document with what the markup alone does not say:
+# rendered visibility, live disabled/value state, and an index into the live
+# elements kept on the page so a node can be resolved back to its element
+SNAPSHOT_SCRIPT = """
+const elements = Array.from(document.querySelectorAll('*'));
+window.__domSnapshot = elements;
+const copy = document.documentElement.cloneNode(true);
+const copies = [copy, ...copy.querySelectorAll('*')];
+elements.forEach((el, index) => {
+    const node = copies[index];
+    if (!node) return;
+    node.setAttribute('data-snapshot-index', index);
+    if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) {
+        node.setAttribute('data-snapshot-visible', '');
+    }
+    if (el.disabled) {
+        node.setAttribute('data-snapshot-disabled', '');
+    }
+    if (el.tagName === 'INPUT' || el.tagName === 'SELECT') {
+        node.setAttribute('data-snapshot-value', el.value);
+    }
+});
+return copy.outerHTML;
+"""
+
+# Prompt options such as "Select a state" or "-- Choose --"
+PLACEHOLDER_PATTERN = re.compile(r"^\W*(select|choose|please|pick)\b|^\W*$", re.IGNORECASE)
+
+ELEMENT_SCRIPT = """
+const elements = window.__domSnapshot || [];
+const el = elements[arguments[0]];
+return el && el.isConnected && el.tagName === arguments[1] ? el : null;
+"""
+
+
+def node_text(node):
+    """Text of a node with whitespace collapsed, close to what element.text returns"""
+    return " ".join(node.text_content().split())
+
+
+class DOMSnapshot:
+    def __init__(self, html):
+        """Parse a snapshot taken by SNAPSHOT_SCRIPT"""
+        self.root = lxml.html.fromstring(html)
+
+    @classmethod
+    def take(cls, driver):
+        """Snapshot the driver's current document in one call"""
+        return cls(driver.execute_script(SNAPSHOT_SCRIPT))
+
+    def visible(self, node):
+        return "data-snapshot-visible" in node.attrib
+
+    def usable(self, node):
+        return self.visible(node) and "data-snapshot-disabled" not in node.attrib
+
+    def find(self, xpaths, usable=False):
+        """Return (xpath, node) for the first visible node the XPaths match, or (None, None)
+
+        With usable=True disabled nodes are skipped too.
+        """
+        accept = self.usable if usable else self.visible
+        for xpath in [xpaths] if isinstance(xpaths, str) else xpaths:
+            for node in self.root.xpath(xpath):
+                if isinstance(node, lxml.html.HtmlElement) and accept(node):
+                    return xpath, node
+        return None, None
+
+    def select(self, name):
+        """The dropdown with the given name attribute, or None"""
+        nodes = self.root.xpath("//select[@name=$name]", name=name)
+        return nodes[0] if nodes else None
+
+    def options(self, name):
+        """Option texts of a dropdown, empty if it is not on the page"""
+        dropdown = self.select(name)
+        if dropdown is None:
+            return []
+        return [node_text(option) for option in dropdown.iter("option")]
+
+    def choices(self, name):
+        """Option texts of a dropdown without its placeholder
+
+        A placeholder is an option with an empty value, or one whose text
+        is a prompt ("Select a state") or the dropdown's own label ("State").
+        """
+        dropdown = self.select(name)
+        if dropdown is None:
+            return []
+        choices = []
+        for option in dropdown.iter("option"):
+            text = node_text(option)
+            if option.get("value", text).strip() == "" or PLACEHOLDER_PATTERN.match(text) or text.lower() == name.lower():
+                continue
+            choices.append(text)
+        return choices
+
+    def selected(self, name, option):
+        """Whether option is the one selected in the dropdown when the snapshot was taken"""
+        dropdown = self.select(name)
+        if dropdown is None or option is None:
+            return False
+        return dropdown.get("data-snapshot-value") == option.get("value", node_text(option))
+
+    def option(self, name, text):
+        """The option of a dropdown showing text, or None"""
+        dropdown = self.select(name)
+        if dropdown is None:
+            return None
+        for option in dropdown.iter("option"):
+            if node_text(option) == text:
+                return option
+        return None
+
+    def text(self, node):
+        return node_text(node)
+
+    def element(self, driver, node):
+        """The live WebElement a snapshot node was taken from, or None if it is gone"""
+        if node is None:
+            return None
+        return driver.execute_script(ELEMENT_SCRIPT, int(node.get("data-snapshot-index")), node.tag.upper())
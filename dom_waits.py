@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+DOM conditions for WebDriverWait
+Used instead of fixed sleeps so each step only waits as long as the page needs.
+The input, dropdown and result checks read one DOM snapshot per poll
+"""
+import re
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+from dom_snapshot import DOMSnapshot
+
+ELECTRICITY_INPUT_SELECTORS = [
+    "//input[@type='text']",
+    "//input[@type='number']",
+    "//input"
+]
+
+
+# The number right before the unit, so the "2" of "CO2e" in a placeholder such as
+# '-- lbs CO2e' is not read as a result
+CARBON_VALUE_PATTERN = r'(\d[\d,]*(?:\.\d+)?)\s*lbs'
+
+
+def parse_carbon_value(text):
+    """Pull the numeric lbs CO2e value out of a result string like '1,369.07 lbs CO2e'
+
+    Returns None when no number comes before the unit.
+    """
+    match = re.search(CARBON_VALUE_PATTERN, text or "", re.IGNORECASE)
+    if not match:
+        return None
+    value_str = match.group(1).replace(',', '')
+    try:
+        return float(value_str)
+    except ValueError:
+        return None
+
+
+def find_displayed(driver, by, selector):
+    """Return the first displayed element matching a selector, or None"""
+    for element in driver.find_elements(by, selector):
+        if element.is_displayed():
+            return element
+    return None
+
+
+class electricity_input_ready:
+    """Wait until a visible, enabled input is rendered and return it
+
+    Each check is one snapshot; only the matching input is fetched back.
+    """
+
+    def __init__(self, selectors=None):
+        self.selectors = selectors or ELECTRICITY_INPUT_SELECTORS
+
+    def __call__(self, driver):
+        snapshot = DOMSnapshot.take(driver)
+        _, node = snapshot.find(self.selectors, usable=True)
+        if node is None:
+            return False
+        return snapshot.element(driver, node) or False
+
+
+class select_has_options:
+    """Wait until a dropdown has more than its placeholder option, optionally a specific one
+
+    Takes the dropdown's name attribute and returns the DOMSnapshot it was
+    seen in, so callers can read the options without further round-trips.
+    """
+
+    def __init__(self, name, option_text=None):
+        self.name = name
+        self.option_text = option_text
+
+    def __call__(self, driver):
+        snapshot = DOMSnapshot.take(driver)
+        if not snapshot.choices(self.name):
+            return False
+        if self.option_text and self.option_text not in snapshot.options(self.name):
+            return False
+        return snapshot
+
+
+class result_value_changed:
+    """Wait until a result node shows a parsable value that differs from the previous reading
+
+    Returns the node text. With previous_text=None any parsable value is accepted.
+    The XPath that matched is kept in matched_xpath.
+    """
+
+    def __init__(self, xpaths, previous_text=None):
+        self.xpaths = [xpaths] if isinstance(xpaths, str) else list(xpaths)
+        self.previous_text = previous_text
+        self.matched_xpath = None
+
+    def __call__(self, driver):
+        snapshot = DOMSnapshot.take(driver)
+        for xpath in self.xpaths:
+            for node in snapshot.root.xpath(xpath):
+                if not snapshot.visible(node):
+                    continue
+                text = snapshot.text(node)
+                if parse_carbon_value(text) is None:
+                    continue
+                if self.previous_text is not None and text == self.previous_text:
+                    continue
+                self.matched_xpath = xpath
+                return text
+        return False
+
+
+class element_enabled:
+    """Wait until an element matching the XPath is displayed and enabled, and return it"""
+
+    def __init__(self, xpath):
+        self.xpath = xpath
+
+    def __call__(self, driver):
+        try:
+            element = driver.find_element(By.XPATH, self.xpath)
+            if element.is_displayed() and element.is_enabled():
+                return element
+        except WebDriverException:
+            pass
+        return False
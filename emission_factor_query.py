@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Offline Emission Factor Queries
+Answers "what is X kWh in country Y" from already scraped results, without a browser
+"""
+import re
+import sys
+import numpy as np
+import pandas as pd
+from regions import region_key, region_label
+
+RESULT_FILES = {
+    "individual": "multi_tab_smart_results.csv",
+    "business": "multi_tab_smart_business_results.csv"
+}
+
+
+class EmissionFactorTable:
+    def __init__(self):
+        """Initialize an empty table, one array-backed block per calculator type"""
+        self.tables = {}  # calculator -> {"countries", "index", "grid", "values", "factors", "results"}
+
+    @classmethod
+    def from_csv_files(cls, files=None):
+        """Load the merged results CSVs, e.g. {"individual": "multi_tab_smart_results.csv"}"""
+        table = cls()
+        for calculator, filename in (files or RESULT_FILES).items():
+            try:
+                table.add_csv(calculator, filename)
+            except FileNotFoundError:
+                print(f"No results file for {calculator} calculator: {filename}")
+        return table
+
+    def add_csv(self, calculator, filename):
+        """Load a results CSV with a Country column and one <kwh>kwh column per measurement
+
+        Rows with a State are added as "<country> / <state>", e.g. "Canada / Ontario".
+        """
+        df = pd.read_csv(filename)
+        results = {}
+        for _, row in df.iterrows():
+            country_results = {}
+            for column in df.columns:
+                match = re.fullmatch(r'(\d+(?:\.\d+)?)kwh', str(column).strip(), re.IGNORECASE)
+                if not match:
+                    continue
+                value = pd.to_numeric(row[column], errors='coerce')
+                if pd.notna(value):
+                    country_results[float(match.group(1))] = float(value)
+            state = row.get('State')
+            state = str(state).strip() if pd.notna(state) else None
+            results[region_key(str(row['Country']).strip(), state)] = country_results
+        self.add_results(calculator, results)
+
+    def add_results(self, calculator, results):
+        """Merge a scraper's {region: {kwh: value}} results into the table
+
+        Countries that are already present are overwritten by the new values.
+        A (country, state) region is stored as "<country> / <state>".
+        """
+        merged = {}
+        if calculator in self.tables:
+            merged = {country: dict(measured) for country, measured in self.tables[calculator]["results"].items()}
+        for region, country_results in results.items():
+            merged.setdefault(region_label(region), {}).update({float(kwh): float(value) for kwh, value in country_results.items()})
+
+        countries = sorted(merged)
+        # 0 kWh is always 0 lbs CO2e, which anchors queries below the smallest measurement
+        grid = np.array(sorted({0.0} | {kwh for values in merged.values() for kwh in values}))
+        values = np.full((len(countries), len(grid)), np.nan)
+        factors = np.full(len(countries), np.nan)
+
+        for i, country in enumerate(countries):
+            measured = merged[country]
+            if not measured:
+                continue
+            known_kwh = np.array([0.0] + sorted(measured))
+            known_values = np.array([0.0] + [measured[kwh] for kwh in sorted(measured)])
+            # Fill grid points this country was not measured at from its own curve
+            values[i] = np.interp(grid, known_kwh, known_values)
+            if len(known_kwh) > 2:
+                # Beyond the last measurement keep the slope of the last segment
+                slope = (known_values[-1] - known_values[-2]) / (known_kwh[-1] - known_kwh[-2])
+            else:
+                slope = known_values[-1] / known_kwh[-1]
+            beyond = grid > known_kwh[-1]
+            values[i, beyond] = known_values[-1] + slope * (grid[beyond] - known_kwh[-1])
+            factors[i] = known_values[-1] / known_kwh[-1]
+
+        self.tables[calculator] = {
+            "countries": countries,
+            "index": pd.Index(countries),
+            "grid": grid,
+            "values": values,
+            "factors": factors,
+            "results": merged
+        }
+
+    def country_codes(self, countries, calculator="individual"):
+        """Map country names to row numbers, -1 for unknown countries"""
+        table = self._table(calculator)
+        return table["index"].get_indexer(pd.Index(np.asarray(countries, dtype=object)))
+
+    def query_codes(self, codes, kwh_values, calculator="individual"):
+        """Vectorized lbs CO2e for row numbers from country_codes() and kWh values
+
+        Piecewise-linear between measured kWh values, extrapolated beyond the
+        largest one. Unknown countries give NaN.
+        """
+        table = self._table(calculator)
+        grid, values = table["grid"], table["values"]
+        codes = np.asarray(codes, dtype=np.intp)
+        kwh = np.asarray(kwh_values, dtype=float)
+        codes, kwh = np.broadcast_arrays(codes, kwh)
+
+        if len(grid) < 2 or not len(values):
+            return np.full(kwh.shape, np.nan)
+
+        segment = np.clip(np.searchsorted(grid, kwh, side='right') - 1, 0, len(grid) - 2)
+        rows = np.where(codes >= 0, codes, 0)
+        x0, x1 = grid[segment], grid[segment + 1]
+        y0, y1 = values[rows, segment], values[rows, segment + 1]
+        result = y0 + (y1 - y0) * (kwh - x0) / (x1 - x0)
+        result[codes < 0] = np.nan
+        return result
+
+    def query_batch(self, countries, kwh_values, calculator="individual"):
+        """Vectorized lbs CO2e for parallel arrays of country names and kWh values"""
+        return self.query_codes(self.country_codes(countries, calculator), kwh_values, calculator)
+
+    def query(self, country, kwh, calculator="individual"):
+        """lbs CO2e for a single country and kWh value, None if the country is unknown"""
+        value = self.query_batch([country], [kwh], calculator)[0]
+        return None if np.isnan(value) else float(value)
+
+    def factor(self, country, calculator="individual"):
+        """lbs CO2e per kWh at the largest measured value, None if the country is unknown"""
+        code = self.country_codes([country], calculator)[0]
+        if code < 0:
+            return None
+        value = self._table(calculator)["factors"][code]
+        return None if np.isnan(value) else float(value)
+
+    def countries(self, calculator="individual"):
+        """Countries available for a calculator type"""
+        return list(self._table(calculator)["countries"])
+
+    def _table(self, calculator):
+        if calculator not in self.tables:
+            raise KeyError(f"No results loaded for {calculator} calculator")
+        return self.tables[calculator]
+
+
+def main():
+    """Answer a single query from the command line: <country> <kwh> [individual|business]"""
+    if len(sys.argv) < 3:
+        print("Usage: python emission_factor_query.py <country> <kwh> [individual|business]")
+        sys.exit(1)
+
+    country, kwh = sys.argv[1], float(sys.argv[2])
+    calculator = sys.argv[3] if len(sys.argv) > 3 else "individual"
+
+    table = EmissionFactorTable.from_csv_files()
+    value = table.query(country, kwh, calculator)
+    if value is None:
+        print(f"No {calculator} results for {country}")
+        sys.exit(1)
+    print(f"{country}, {kwh:g} kWh ({calculator}): {value:.2f} lbs CO2e")
+
+if __name__ == "__main__":
+    main()
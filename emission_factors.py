@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Per-country emission factors (lbs CO2e per kWh)
+The calculator output is linear in kWh for most countries, so one or two
+measurements are enough to fill in the whole kWh grid
+"""
+import csv
+from regions import split_region
+
+# Displayed results are rounded to 2 decimals, so a prediction made from the
+# largest measurement can be off by up to ~0.01 lbs at the smaller points
+ABSOLUTE_TOLERANCE = 0.011
+RELATIVE_TOLERANCE = 1e-4
+
+
+def probe_points(electricity_values, count=2):
+    """Pick the kWh values to measure: the largest first, then the smallest"""
+    values = sorted(set(electricity_values))
+    if count <= 1 or len(values) == 1:
+        return values[-1:]
+    return [values[-1], values[0]]
+
+
+def fit_factor(measurements):
+    """Estimate lbs CO2e per kWh from {kwh: value}, using the largest kWh for precision"""
+    usable = {kwh: value for kwh, value in measurements.items() if kwh and value is not None}
+    if not usable:
+        return None
+    kwh = max(usable)
+    return usable[kwh] / kwh
+
+
+def is_linear(measurements, factor):
+    """Check that every measurement lies on value = factor * kWh within rounding"""
+    if factor is None:
+        return False
+    for kwh, value in measurements.items():
+        expected = factor * kwh
+        if abs(value - expected) > ABSOLUTE_TOLERANCE + RELATIVE_TOLERANCE * abs(expected):
+            return False
+    return True
+
+
+def fill_grid(factor, electricity_values, measurements=None):
+    """Build {kwh: value} for every requested kWh, keeping measured values as-is"""
+    results = {kwh: round(factor * kwh, 2) for kwh in electricity_values}
+    if measurements:
+        results.update({kwh: value for kwh, value in measurements.items() if kwh in results})
+    return results
+
+
+def save_factors(emission_factors, filename):
+    """Save {region: factor} to a CSV file, with the state of state-level factors"""
+    if not emission_factors:
+        return
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Country", "State", "lbs_co2e_per_kwh"])
+        for region, factor in emission_factors.items():
+            country, state = split_region(region)
+            writer.writerow([country, state or "", f"{factor:.8f}"])
+    print(f"Emission factors saved to {filename}")
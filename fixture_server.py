@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Terrapass calculator
+Serves a marketing page framing a calculator document that follows the same
+flow and markup the scrapers rely on: Individual/Business entry, Home Energy,
+country select with a state dropdown for some countries, NEXT/Prev, the
+electricity input and the lbs CO2e result. Latency and failures are
+configurable so benchmarks can exercise timeouts and retries offline
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from regions import region_label
+
+FIXTURE_COUNTRIES = [
+    "United States", "Albania", "Angola", "Argentina", "Australia", "Austria", "Belgium", "Brazil",
+    "Canada", "Chile", "China", "Denmark", "Egypt", "France", "Germany", "India", "Italy", "Japan",
+    "Kenya", "Mexico", "Norway", "Poland", "Spain", "Sweden", "United Kingdom"
+]
+STATE_COUNTRIES = {
+    "United States": ["California", "New York", "Texas"],
+    "Canada": ["Ontario", "Quebec"],
+    "Australia": ["New South Wales", "Victoria"]
+}
+
+MARKETING_PAGE = """<!DOCTYPE html>
+<html><head><title>Carbon Footprint Calculator</title></head>
+<body>
+<h1>Carbon Footprint Calculator</h1>
+<iframe class="calculator" src="/calculator/" width="800" height="600"></iframe>
+</body></html>
+"""
+
+CALCULATOR_PAGE = """<!DOCTYPE html>
+<html><head><title>Calculator</title></head>
+<body>
+<div id="app"></div>
+<script>
+const config = __CONFIG__;
+const app = document.getElementById('app');
+const state = {flow: null, country: null, region: null, kwh: ''};
+const later = (fn, ms) => ms > 0 ? setTimeout(fn, ms) : fn();
+
+function render(html) {
+    app.innerHTML = html;
+}
+
+function landing() {
+    render('<a href="#" id="individual">Individual Calculator</a> <a href="#" id="business">Business Calculator</a>');
+    document.getElementById('individual').onclick = event => {
+        event.preventDefault();
+        state.flow = 'individual';
+        render('<nav><a href="#" class="ico-home" id="home">Home Energy</a></nav>');
+        document.getElementById('home').onclick = event => { event.preventDefault(); countryStep(); };
+    };
+    document.getElementById('business').onclick = event => {
+        event.preventDefault();
+        state.flow = 'business';
+        countryStep();
+    };
+}
+
+function countryStep() {
+    render('<select name="country"><option>Country</option></select>' +
+           '<div id="states"></div><button id="next">NEXT</button>');
+    const select = app.querySelector('select[name=country]');
+    later(() => {
+        for (const name of config.countries) {
+            select.add(new Option(name, name));
+        }
+        if (state.country) select.value = state.country;
+    }, config.step_latency);
+    select.onchange = () => {
+        state.country = select.value;
+        state.region = null;
+        const holder = document.getElementById('states');
+        holder.innerHTML = '';
+        const states = config.states[select.value];
+        if (!states) return;
+        later(() => {
+            holder.innerHTML = '<select name="state"><option>State</option>' +
+                states.map(name => '<option>' + name + '</option>').join('') + '</select>';
+            const stateSelect = holder.querySelector('select');
+            stateSelect.onchange = () => {
+                state.region = stateSelect.value === 'State' ? null : stateSelect.value;
+            };
+        }, config.step_latency);
+    };
+    document.getElementById('next').onclick = () => {
+        if (!state.country || state.country === 'Country') return;
+        if (config.states[state.country] && !state.region) return;
+        inputStep();
+    };
+}
+
+function inputStep() {
+    const section = state.flow === 'business' ? 'Business Site' : 'Home Energy';
+    render('<h2>' + section + '</h2><label>Electricity (kWh) <input type="text" name="electricity"></label>' +
+           '<button id="prev">Prev</button><button id="next">NEXT</button>');
+    const input = app.querySelector('input[name=electricity]');
+    input.value = state.kwh;
+    input.oninput = input.onchange = () => { state.kwh = input.value; };
+    document.getElementById('prev').onclick = countryStep;
+    document.getElementById('next').onclick = () => {
+        // Failure injection: the submission is dropped and no result ever renders
+        if (Math.random() < config.failure_rate) return;
+        resultStep();
+    };
+}
+
+function resultStep() {
+    const section = state.flow === 'business' ? 'Business Site' : 'Home Energy';
+    const key = state.region ? state.country + ' / ' + state.region : state.country;
+    const factor = config.factors[key] * (state.flow === 'business' ? 1.1 : 1);
+    const value = (parseFloat(state.kwh) || 0) * 12 * factor;
+    render('<div id="result"><span>' + section + '</span><span class="pending">Calculating...</span></div>' +
+           '<button id="prev" disabled>Prev</button>');
+    const prev = document.getElementById('prev');
+    prev.onclick = inputStep;
+    later(() => {
+        const node = app.querySelector('.pending');
+        node.textContent = value.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2}) + ' lbs CO2e';
+        prev.disabled = false;
+    }, config.result_latency);
+}
+
+landing();
+</script>
+</body></html>
+"""
+
+
+def emission_factor(country):
+    """A stable made-up lbs CO2e/kWh factor per country"""
+    digest = hashlib.sha256(country.encode()).digest()
+    return round(0.5 + digest[0] / 255, 4)
+
+
+class FixtureServer:
+    def __init__(self, host="127.0.0.1", port=0, page_latency=0.0, step_latency=0.1, result_latency=0.3,
+                 failure_rate=0.0, countries=None):
+        """Serve the stand-in calculator
+
+        page_latency delays every HTTP response (seconds), step_latency the
+        country and state dropdowns, result_latency the result. failure_rate
+        is the share of result submissions that are silently dropped.
+        """
+        self.page_latency = page_latency
+        self.config = {
+            "countries": list(countries or FIXTURE_COUNTRIES),
+            "states": STATE_COUNTRIES,
+            "factors": {region: emission_factor(region) for region in self.regions(countries or FIXTURE_COUNTRIES)},
+            "step_latency": int(step_latency * 1000),
+            "result_latency": int(result_latency * 1000),
+            "failure_rate": failure_rate
+        }
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread = None
+
+    def regions(self, countries):
+        """Every country, plus "<country> / <state>" for the states of state countries"""
+        regions = list(countries)
+        for country in countries:
+            regions.extend(f"{country} / {state}" for state in STATE_COUNTRIES.get(country, []))
+        return regions
+
+    def handler_class(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture.requests += 1
+                path = urlparse(self.path).path.rstrip("/")
+                if path == "/carbon-footprint-calculator":
+                    body = MARKETING_PAGE
+                elif path == "/calculator":
+                    body = CALCULATOR_PAGE.replace("__CONFIG__", json.dumps(fixture.config))
+                else:
+                    self.send_error(404)
+                    return
+                if fixture.page_latency:
+                    time.sleep(fixture.page_latency)
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def page_url(self):
+        """The stand-in for CALCULATOR_PAGE_URL"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/carbon-footprint-calculator/"
+
+    def expected_value(self, region, kwh, business=False):
+        """What the calculator shows for a country or (country, state) and kWh value, for checking scraped results"""
+        factor = self.config["factors"][region_label(region)] * (1.1 if business else 1)
+        return round(kwh * 12 * factor, 2)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    """Serve the stand-in calculator: python fixture_server.py [port]"""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = FixtureServer(port=port)
+    print(f"Stand-in calculator at {server.page_url}")
+    print(f"Point the scrapers at it with CALCULATOR_PAGE_URL={server.page_url}")
+    server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
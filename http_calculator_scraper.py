@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+HTTP Carbon Calculator Scraper
+Reads the country list and electricity emission factors straight from the
+calculator iframe and its data files with requests/BeautifulSoup, and only
+falls back to Selenium for countries whose factor could not be found
+"""
+import json
+import os
+import re
+from urllib.parse import urljoin, urlsplit
+import requests
+from bs4 import BeautifulSoup
+import calculator_page
+from emission_factors import fill_grid, ABSOLUTE_TOLERANCE, RELATIVE_TOLERANCE
+from emission_factor_query import EmissionFactorTable
+from results_sink import ResultsSink, export_results
+
+# The calculator takes monthly kWh and shows annual lbs CO2e; assumed when nothing to calibrate against
+MONTHS_PER_YEAR = 12
+
+# Results of a Selenium run, used to calibrate the factor-to-result conversion
+REFERENCE_FILE = "multi_tab_smart_results.csv"
+
+# Conversion of the factor units we have seen in calculator data to lbs CO2e per kWh
+UNIT_TO_LBS = {
+    "lbs": 1.0,
+    "kg": 2.20462262,
+    "g": 0.00220462262,
+    "t": 2204.62262
+}
+
+# Keys that hold an electricity emission factor in config objects
+FACTOR_KEY_PATTERN = re.compile(r'electric|factor|emission|co2|ef$', re.IGNORECASE)
+NAME_KEYS = ("name", "country", "label", "title")
+# Keys that hold the country list in config objects
+COUNTRY_LIST_KEY_PATTERN = re.compile(r'countr', re.IGNORECASE)
+
+# Script and data URLs that may hold calculator configuration
+DATA_URL_PATTERN = re.compile(r'["\']([^"\'\s]+?\.json(?:\?[^"\'\s]*)?|[^"\'\s]*/api/[^"\'\s]+)["\']')
+JSON_START_PATTERN = re.compile(r'[{\[]')
+
+
+class HttpCarbonCalculatorScraper:
+    def __init__(self, page_url=None, session=None, timeout=10, factor_units="lbs", reference_file=REFERENCE_FILE):
+        """Initialize the scraper
+
+        page_url can point at a local server serving recorded pages; it
+        defaults to calculator_page.CALCULATOR_PAGE_URL as set when the page
+        is fetched. reference_file is a results CSV of a Selenium run that
+        the factor-to-result conversion is calibrated against.
+        """
+        self.page_url = page_url
+        self.reference_file = reference_file
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)")
+        self.timeout = timeout
+        self.factor_multiplier = UNIT_TO_LBS[factor_units]
+        self.calculator_url = None
+        self.countries = []
+        self.emission_factors = {}  # lbs CO2e per kWh
+        self.results = {}
+        self.missing_countries = []  # Countries without a factor in the fetched data
+        self.scale = None  # Calculator result per factor x kWh, from calibrate()
+
+    def fetch(self, url):
+        """GET a URL and return its text"""
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def discover_calculator_url(self):
+        """Find the calculator iframe's src on the marketing page"""
+        page_url = self.page_url or calculator_page.CALCULATOR_PAGE_URL
+        soup = BeautifulSoup(self.fetch(page_url), "html.parser")
+        iframe = soup.select_one("iframe.calculator")
+        if iframe is None or not iframe.get("src"):
+            raise ValueError(f"No calculator iframe found on {page_url}")
+        self.calculator_url = urljoin(page_url, iframe["src"])
+        print(f"Calculator iframe: {self.calculator_url}")
+        return self.calculator_url
+
+    def parse_country_list(self, soup):
+        """Read the country names from the country dropdown"""
+        select = soup.select_one("select[name='country']")
+        if select is None:
+            return []
+        return [option.get_text(strip=True) for option in select.find_all("option")
+                if option.get_text(strip=True) and option.get_text(strip=True) != "Country"]
+
+    def extract_config_countries(self, sources):
+        """Read the country list from JSON config, for dropdowns that are filled in by script"""
+        countries = []
+        for _, text in sources:
+            for data in iter_json_blocks(text):
+                for names in walk_for_country_lists(data):
+                    if len(names) > len(countries):
+                        countries = names
+        return [name for name in countries if name != "Country"]
+
+    def collect_sources(self, soup, base_url):
+        """Return (URL, text) of linked scripts and referenced data files, and (None, text) of inline scripts"""
+        sources = []
+        urls = []
+        for script in soup.find_all("script"):
+            if script.get("src"):
+                urls.append(urljoin(base_url, script["src"]))
+            elif script.string:
+                sources.append((None, script.string))
+
+        for _, text in list(sources):
+            urls.extend(urljoin(base_url, match) for match in DATA_URL_PATTERN.findall(text))
+
+        seen = set()
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            try:
+                text = self.fetch(url)
+            except requests.RequestException as e:
+                print(f"Could not fetch {url}: {e}")
+                continue
+            sources.append((url, text))
+            # Scripts can reference further data files
+            for match in DATA_URL_PATTERN.findall(text):
+                data_url = urljoin(url, match)
+                if data_url not in seen:
+                    urls.append(data_url)
+        return sources
+
+    def extract_option_factors(self, soup, countries):
+        """Factors stored as data-* attributes on the country options"""
+        factors = {}
+        select = soup.select_one("select[name='country']")
+        if select is None:
+            return factors
+        for option in select.find_all("option"):
+            name = option.get_text(strip=True)
+            if name not in countries:
+                continue
+            for attribute, value in option.attrs.items():
+                if attribute.startswith("data-") and FACTOR_KEY_PATTERN.search(attribute[5:]):
+                    number = to_number(value)
+                    if number is not None:
+                        factors[name] = number
+                        break
+        return factors
+
+    def extract_config_factors(self, sources, countries):
+        """Factors found in JSON objects embedded in scripts or data files
+
+        A data file's name counts as the key of its top-level object, so
+        e.g. emission_factors.json may be a plain {country: factor} map.
+        """
+        factors = {}
+        country_set = set(countries)
+        for url, text in sources:
+            key = os.path.splitext(os.path.basename(urlsplit(url).path))[0] if url else None
+            for data in iter_json_blocks(text):
+                walk_for_factors(data, country_set, factors, key)
+        return factors
+
+    def fetch_emission_factors(self):
+        """Fetch the calculator document and parse its countries and factors"""
+        if self.calculator_url is None:
+            self.discover_calculator_url()
+
+        soup = BeautifulSoup(self.fetch(self.calculator_url), "html.parser")
+        sources = None
+        self.countries = self.parse_country_list(soup)
+        if not self.countries:
+            # The dropdown is filled in by script, read the list from its config
+            sources = self.collect_sources(soup, self.calculator_url)
+            self.countries = self.extract_config_countries(sources)
+        print(f"Found {len(self.countries)} countries")
+        if not self.countries:
+            raise ValueError(f"No countries found in the calculator at {self.calculator_url}")
+
+        factors = self.extract_option_factors(soup, self.countries)
+        if len(factors) < len(self.countries):
+            if sources is None:
+                sources = self.collect_sources(soup, self.calculator_url)
+            for country, factor in self.extract_config_factors(sources, self.countries).items():
+                factors.setdefault(country, factor)
+
+        self.emission_factors = {country: factor * self.factor_multiplier for country, factor in factors.items()}
+        self.missing_countries = [country for country in self.countries if country not in self.emission_factors]
+        print(f"Parsed emission factors for {len(self.emission_factors)} countries, "
+              f"{len(self.missing_countries)} without a factor")
+        return self.emission_factors
+
+    def load_reference(self):
+        """Results of the reference CSV as {country: {kwh: value}}, empty if there is none"""
+        if not self.reference_file or not os.path.exists(self.reference_file):
+            return {}
+        table = EmissionFactorTable()
+        table.add_csv("reference", self.reference_file)
+        return table.tables["reference"]["results"]
+
+    def calibrate(self, electricity_values, fallback=None):
+        """Work out the calculator result per factor x kWh from one measured point
+
+        The calculator takes monthly kWh and reports annual lbs CO2e, and
+        factors in the data may be in other units, so the conversion is taken
+        from the reference CSV, or from one country measured with fallback.
+        Without either, MONTHS_PER_YEAR is assumed. The other reference points
+        are then checked against the calibrated values.
+        """
+        reference = {country: measured for country, measured in self.load_reference().items()
+                     if country in self.emission_factors and measured}
+        source = self.reference_file
+        if not reference and fallback and self.emission_factors:
+            country = next(iter(self.emission_factors))
+            print(f"Measuring {country} in the browser to calibrate the factors")
+            measured = fallback([country], electricity_values[-1:]) or {}
+            reference = {country: measured[country]} if measured.get(country) else {}
+            source = "a browser measurement"
+        if not reference:
+            print(f"Nothing to calibrate against, assuming {MONTHS_PER_YEAR} x factor x kWh")
+            self.scale = MONTHS_PER_YEAR
+            return self.scale
+
+        # The largest value has the smallest rounding error
+        country, measured = next(iter(reference.items()))
+        kwh = max(measured)
+        scale = measured[kwh] / (self.emission_factors[country] * kwh)
+        # Snap to a whole multiple such as 12 months when the rounding allows it
+        if round(scale) and abs(scale - round(scale)) <= round(scale) * 1e-3:
+            scale = round(scale)
+        self.scale = scale
+        print(f"Calibrated against {country} at {kwh:g} kWh from {source}: result = {scale:g} x factor x kWh")
+
+        mismatches = self.check_against(reference)
+        if mismatches:
+            print(f"{len(mismatches)} reference values differ from the calibrated HTTP values, "
+                  f"e.g. {mismatches[0][0]} at {mismatches[0][1]:g} kWh: {mismatches[0][2]} vs {mismatches[0][3]}")
+        return self.scale
+
+    def check_against(self, reference):
+        """Return (country, kwh, reference value, HTTP value) for every reference value the HTTP values miss"""
+        mismatches = []
+        for country, measured in reference.items():
+            if country not in self.emission_factors:
+                continue
+            for kwh, value in measured.items():
+                predicted = round(self.emission_factors[country] * self.scale * kwh, 2)
+                if abs(predicted - value) > ABSOLUTE_TOLERANCE + RELATIVE_TOLERANCE * abs(value):
+                    mismatches.append((country, kwh, value, predicted))
+        return mismatches
+
+    def run_analysis(self, electricity_values, fallback=None):
+        """Build {country: {kwh: lbs CO2e}} like the Selenium scrapers
+
+        fallback(countries, electricity_values) is called for countries without
+        a factor and should return results in the same shape. If the page
+        cannot be parsed at all, it is called with countries=None for the
+        whole list; without a fallback the error is raised.
+        """
+        try:
+            self.fetch_emission_factors()
+        except (ValueError, requests.RequestException) as e:
+            if not fallback:
+                raise
+            print(f"Could not read the calculator over HTTP ({e}), falling back to the browser")
+            self.results.update(fallback(None, electricity_values) or {})
+            return self.results
+
+        if self.emission_factors:
+            self.calibrate(electricity_values, fallback)
+            # Stored per kWh as entered, like the factors of the Selenium scrapers' probe mode
+            self.emission_factors = {country: factor * self.scale for country, factor in self.emission_factors.items()}
+        for country, factor in self.emission_factors.items():
+            self.results[country] = fill_grid(factor, electricity_values)
+
+        if fallback and self.missing_countries:
+            print(f"Falling back to the browser for {len(self.missing_countries)} countries")
+            self.results.update(fallback(self.missing_countries, electricity_values) or {})
+        return self.results
+
+
+def to_number(value):
+    """Parse a number from a string or number, None if it is not one"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def iter_json_blocks(text):
+    """Yield every top-level {...} or [...] block in a script that parses as JSON"""
+    text = text.strip()
+    if text and text[0] in "{[":
+        try:
+            yield json.loads(text)
+            return
+        except ValueError:
+            pass
+
+    decoder = json.JSONDecoder()
+    index = 0
+    while True:
+        match = JSON_START_PATTERN.search(text, index)
+        if not match:
+            return
+        try:
+            data, end = decoder.raw_decode(text, match.start())
+        except ValueError:
+            index = match.start() + 1
+            continue
+        if isinstance(data, (dict, list)) and data:
+            yield data
+        index = end
+
+
+def item_name(item):
+    """The name of a list entry: the string itself, or the name field of a record"""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return next((item[key] for key in NAME_KEYS if isinstance(item.get(key), str)), None)
+    return None
+
+
+def walk_for_country_lists(data, key=None):
+    """Yield the name lists held under country keys, e.g. {"countries": ["Austria", ...]}"""
+    if isinstance(data, dict):
+        for child_key, value in data.items():
+            yield from walk_for_country_lists(value, child_key)
+    elif isinstance(data, list):
+        if key is not None and COUNTRY_LIST_KEY_PATTERN.search(str(key)):
+            names = [name.strip() for name in map(item_name, data) if name and name.strip()]
+            if len(names) > 1:
+                yield names
+        for item in data:
+            yield from walk_for_country_lists(item)
+
+
+def walk_for_factors(data, countries, factors, key=None):
+    """Collect country factors from {"Austria": 2.11} maps or [{"name": "Austria", "electricity": 2.11}] records
+
+    A {country: number} map only counts when it is held under a factor key
+    (e.g. "factors" or "electricity"), so other per-country numbers such as
+    populations are not taken for factors.
+    """
+    factor_map = key is not None and FACTOR_KEY_PATTERN.search(str(key))
+    if isinstance(data, dict):
+        name = item_name(data)
+        if name in countries:
+            for key, value in data.items():
+                number = to_number(value) if FACTOR_KEY_PATTERN.search(str(key)) else None
+                if number is not None:
+                    factors.setdefault(name, number)
+                    break
+
+        for child_key, value in data.items():
+            if factor_map and child_key in countries:
+                number = to_number(value)
+                if number is not None:
+                    factors.setdefault(child_key, number)
+                    continue
+            walk_for_factors(value, countries, factors, child_key)
+    elif isinstance(data, list):
+        for item in data:
+            walk_for_factors(item, countries, factors, key)
+
+
+def selenium_fallback(countries, electricity_values):
+    """Measure the given countries (all of them for None) with the multi-tab Selenium scraper"""
+    from multi_tab_smart_scraper import MultiTabSmartScraper
+
+    scraper = MultiTabSmartScraper()
+    scraper.run_multi_tab_smart_analysis(electricity_values, num_tabs=min(20, len(countries)) if countries else 20,
+                                         countries=countries, checkpoint_file=None,
+                                         results_file="http_fallback_rows.csv")
+    return scraper.results
+
+
+def main():
+    """Main function to run the HTTP analysis"""
+    electricity_values = [50, 100, 250, 500, 1000]
+
+    scraper = HttpCarbonCalculatorScraper()
+    results = scraper.run_analysis(electricity_values, fallback=selenium_fallback)
+
+    # Same rows file and export step as the Selenium scrapers
+    sink = ResultsSink("http_results_rows.csv", append=False)
+    for country, country_results in results.items():
+        sink.write_many(country, country_results)
+    sink.close()
+    export_results("http_results_rows.csv", "http_results.xlsx", electricity_values, scraper.emission_factors)
+
+    print(f"\nCountries with results: {len(results)}")
+
+if __name__ == "__main__":
+    main()
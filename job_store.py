@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Shared job store for distributed runs
+(calculator, country, kWh) jobs that several nodes lease, measure and write
+back. Backed by SQLite on a shared volume, or by a small HTTP coordinator in
+front of the same SQLite store. Leases expire, so the jobs of a node that
+died go back to the queue on their own
+"""
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    calculator TEXT NOT NULL,
+    country TEXT NOT NULL,
+    kwh INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    value REAL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (calculator, country, kwh)
+)
+"""
+
+# Methods the HTTP coordinator exposes
+STORE_METHODS = ("add_jobs", "kwh_values", "lease", "complete", "release", "mark_states_required",
+                 "counts", "results", "states_required")
+
+
+class SQLiteJobStore:
+    def __init__(self, path, lease_seconds=600):
+        """Open (or create) the job database
+
+        A lease is extended every time a result for it comes in; one that
+        sees no result for lease_seconds is handed to another node.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        with self.connect() as connection:
+            connection.execute(SCHEMA)
+
+    def connect(self):
+        # One connection per call, so threads and processes never share one
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return ClosingConnection(connection)
+
+    def add_jobs(self, calculator, countries, kwh_values):
+        """Queue every (country, kWh) pair that is not in the store yet; returns the number added"""
+        rows = [(calculator, country, kwh) for country in countries for kwh in kwh_values]
+        with self.connect() as connection:
+            before = connection.total_changes
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT OR IGNORE INTO jobs (calculator, country, kwh) VALUES (?, ?, ?)", rows)
+            connection.execute("COMMIT")
+            return connection.total_changes - before
+
+    def kwh_values(self, calculator):
+        with self.connect() as connection:
+            rows = connection.execute("SELECT DISTINCT kwh FROM jobs WHERE calculator = ? ORDER BY kwh",
+                                      (calculator,)).fetchall()
+        return [kwh for (kwh,) in rows]
+
+    def lease(self, calculator, owner, max_retries=2):
+        """Lease every open job of the next country
+
+        Returns {"country", "kwh": leased values, "done": [[kwh, value], ...]}
+        or None when nothing is pending. Expired leases are handled first:
+        an expiry counts as a failed attempt, so a job goes back to pending
+        while it has retries left and is marked failed otherwise.
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "UPDATE jobs SET status = CASE WHEN attempts <= ? THEN 'pending' ELSE 'failed' END, "
+                    "owner = NULL, lease_expires = NULL "
+                    "WHERE calculator = ? AND status = 'leased' AND lease_expires < ?", (max_retries, calculator, now))
+                row = connection.execute(
+                    "SELECT country FROM jobs WHERE calculator = ? AND status = 'pending' ORDER BY rowid LIMIT 1",
+                    (calculator,)).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                country = row[0]
+                connection.execute(
+                    "UPDATE jobs SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE calculator = ? AND country = ? AND status = 'pending'",
+                    (owner, now + self.lease_seconds, calculator, country))
+                leased = connection.execute(
+                    "SELECT kwh FROM jobs WHERE calculator = ? AND country = ? AND status = 'leased' AND owner = ?",
+                    (calculator, country, owner)).fetchall()
+                done = connection.execute(
+                    "SELECT kwh, value FROM jobs WHERE calculator = ? AND country = ? AND status = 'done'",
+                    (calculator, country)).fetchall()
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return {"country": country, "kwh": [kwh for (kwh,) in leased], "done": [list(row) for row in done]}
+
+    def complete(self, calculator, country, kwh, value, owner):
+        """Store a result and extend the lease on the rest of the country
+
+        Only the current lease holder can complete a job; returns False, and
+        stores nothing, if owner's lease expired or went to another node.
+        """
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            accepted = connection.execute(
+                "UPDATE jobs SET status = 'done', value = ?, owner = NULL, lease_expires = NULL "
+                "WHERE calculator = ? AND country = ? AND kwh = ? AND status = 'leased' AND owner = ?",
+                (value, calculator, country, kwh, owner)).rowcount > 0
+            if accepted:
+                connection.execute(
+                    "UPDATE jobs SET lease_expires = ? "
+                    "WHERE calculator = ? AND country = ? AND status = 'leased' AND owner = ?",
+                    (time.time() + self.lease_seconds, calculator, country, owner))
+            connection.execute("COMMIT")
+        return accepted
+
+    def release(self, calculator, country, owner, max_retries=2):
+        """Give back the jobs of a country that owner did not finish
+
+        Each goes back to pending while it has retries left, otherwise it is
+        marked failed. Returns the number re-queued.
+        """
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            requeued = connection.execute(
+                "UPDATE jobs SET status = 'pending', owner = NULL, lease_expires = NULL "
+                "WHERE calculator = ? AND country = ? AND status = 'leased' AND owner = ? AND attempts <= ?",
+                (calculator, country, owner, max_retries)).rowcount
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', owner = NULL, lease_expires = NULL "
+                "WHERE calculator = ? AND country = ? AND status = 'leased' AND owner = ?",
+                (calculator, country, owner))
+            connection.execute("COMMIT")
+        return requeued
+
+    def mark_states_required(self, calculator, country):
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'states_required', owner = NULL, lease_expires = NULL "
+                "WHERE calculator = ? AND country = ? AND status != 'done'", (calculator, country))
+
+    def counts(self, calculator):
+        """Number of jobs per status"""
+        with self.connect() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) FROM jobs WHERE calculator = ? GROUP BY status",
+                                      (calculator,)).fetchall()
+        return dict(rows)
+
+    def results(self, calculator):
+        """Finished jobs as [[country, kwh, value], ...]"""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT country, kwh, value FROM jobs WHERE calculator = ? AND status = 'done' ORDER BY rowid",
+                (calculator,)).fetchall()
+        return [list(row) for row in rows]
+
+    def states_required(self, calculator):
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT DISTINCT country FROM jobs WHERE calculator = ? AND status = 'states_required'",
+                (calculator,)).fetchall()
+        return [country for (country,) in rows]
+
+
+class ClosingConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, *exc_info):
+        self.connection.close()
+
+
+class JobStoreServer:
+    def __init__(self, store, host="0.0.0.0", port=8765):
+        """HTTP coordinator: POST /<method> with {"args": [...]} returns {"result": ...}"""
+        self.store = store
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread = None
+
+    def handler_class(self):
+        store = self.store
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                method = self.path.strip("/")
+                if method not in STORE_METHODS:
+                    self.send_error(404, f"Unknown method {method}")
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    args = json.loads(self.rfile.read(length) or b"{}").get("args", [])
+                    body = json.dumps({"result": getattr(store, method)(*args)}).encode()
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        """Serve in a background thread, e.g. for tests"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        print(f"Job store coordinator listening on {self.url} ({self.store.path})")
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpJobStore:
+    def __init__(self, url, timeout=30):
+        """Client for a JobStoreServer with the same methods as SQLiteJobStore"""
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def call(self, method, *args):
+        response = self.session.post(f"{self.url}/{method}", json={"args": list(args)}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def __getattr__(self, method):
+        if method not in STORE_METHODS:
+            raise AttributeError(method)
+        return lambda *args: self.call(method, *args)
+
+
+def open_job_store(spec, lease_seconds=600):
+    """An HttpJobStore for an http(s):// URL, otherwise a SQLiteJobStore at that path"""
+    if spec.startswith(("http://", "https://")):
+        return HttpJobStore(spec)
+    return SQLiteJobStore(spec, lease_seconds=lease_seconds)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Single round-trip kWh measurement
+One async script sets the electricity input, clicks NEXT, waits in the page
+for the result, reads it and clicks Prev, instead of a WebDriver call per step
+"""
+import json
+from selenium.common.exceptions import WebDriverException
+from dom_waits import ELECTRICITY_INPUT_SELECTORS, CARBON_VALUE_PATTERN, electricity_input_ready
+
+NEXT_XPATHS = [
+    "//button[contains(text(), 'NEXT')]",
+    "//button[contains(text(), 'Next')]",
+    "//button[contains(text(), 'next')]"
+]
+PREV_XPATHS = [
+    "//button[contains(text(), 'Prev')]"
+]
+
+# Lookup and wait helpers shared by the in-page scripts; waitFor rejects after
+# ms (timeoutMs by default), naming the current stage. parseValue uses the
+# Python parser's pattern, so both read the same number off a result
+PAGE_HELPERS = """
+const carbonValuePattern = new RegExp(""" + json.dumps(CARBON_VALUE_PATTERN) + """, 'i');
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const usable = el => visible(el) && !el.disabled;
+const parseValue = text => {
+    const match = carbonValuePattern.exec(text || '');
+    return match ? parseFloat(match[1].replace(/,/g, '')) : NaN;
+};
+const find = (xpaths, accept) => {
+    for (const xpath of xpaths) {
+        const nodes = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < nodes.snapshotLength; i++) {
+            const node = nodes.snapshotItem(i);
+            if (accept(node)) return node;
+        }
+    }
+    return null;
+};
+const waitFor = (check, ms = timeoutMs) => new Promise((resolve, reject) => {
+    const first = check();
+    if (first) return resolve(first);
+    let observer, poll, timer;
+    const finish = value => {
+        observer.disconnect(); clearInterval(poll); clearTimeout(timer);
+        resolve(value);
+    };
+    const test = () => { const value = check(); if (value) finish(value); };
+    observer = new MutationObserver(test);
+    observer.observe(document.documentElement, {subtree: true, childList: true, characterData: true, attributes: true});
+    // Property changes such as disabled are not always visible to the observer
+    poll = setInterval(test, 50);
+    timer = setTimeout(() => {
+        observer.disconnect(); clearInterval(poll);
+        reject(new Error('timed out waiting for ' + stage));
+    }, ms);
+});
+"""
+
+KWH_STEP_SCRIPT = """
+const [kwh, inputXPaths, nextXPaths, resultXPaths, prevXPaths, previousText, timeoutMs, done] = arguments;
+let stage = 'input';
+let value = null, text = null;
+
+""" + PAGE_HELPERS + """
+(async () => {
+    const input = await waitFor(() => find(inputXPaths, usable));
+    const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+    setter.call(input, '');
+    setter.call(input, String(kwh));
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new Event('change', {bubbles: true}));
+
+    stage = 'next';
+    const next = await waitFor(() => find(nextXPaths, usable));
+    next.scrollIntoView(true);
+    next.click();
+
+    stage = 'result';
+    const resultNode = await waitFor(() => find(resultXPaths, node => {
+        const text = (node.innerText || node.textContent).trim();
+        return !isNaN(parseValue(text)) && text !== previousText;
+    }));
+    text = (resultNode.innerText || resultNode.textContent).trim();
+    value = parseValue(text);
+
+    stage = 'prev';
+    const prev = await waitFor(() => find(prevXPaths, usable));
+    prev.click();
+    // Back on the energy page once the result is gone and the input is rendered again
+    await waitFor(() => (!document.contains(resultNode) || !visible(resultNode)) && find(inputXPaths, usable));
+
+    done({ok: true, stage: 'done', value: value, text: text});
+})().catch(error => done({ok: false, stage: stage, error: String(error && error.message || error),
+                          value: value, text: text}));
+"""
+
+
+def run_kwh_step(driver, kwh, result_xpaths, previous_text=None, timeout=5, input_xpaths=None):
+    """Measure one kWh value in a single execute_async_script call
+
+    timeout applies to each in-page wait; input_xpaths defaults to the
+    electricity input selectors. Returns {"ok", "stage", "value",
+    "text", "error"}. When ok is False, stage says how far the page got:
+    "input"/"next" (still on the energy page), "result" (NEXT was clicked)
+    or "prev" (value read but Prev failed).
+    """
+    if isinstance(result_xpaths, str):
+        result_xpaths = [result_xpaths]
+    input_xpaths = list(input_xpaths or ELECTRICITY_INPUT_SELECTORS)
+    try:
+        result = driver.execute_async_script(
+            KWH_STEP_SCRIPT, kwh, input_xpaths, NEXT_XPATHS, list(result_xpaths),
+            PREV_XPATHS, previous_text, int(timeout * 1000)
+        )
+    except WebDriverException as e:
+        # Script timeout or a navigation mid-script; work out where the page is
+        try:
+            stage = "input" if electricity_input_ready(input_xpaths)(driver) else "result"
+        except WebDriverException:
+            stage = "result"
+        return {"ok": False, "stage": stage, "value": None, "text": None, "error": str(e).splitlines()[0]}
+    return result or {"ok": False, "stage": "input", "value": None, "text": None, "error": "no result"}
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Network resource policy for the calculator browsers
+Blocks trackers, fonts, images and media through the Chrome DevTools Protocol
+and gives every browser a persistent disk cache under one shared root, so the
+calculator's JS/CSS is served from disk on later sessions
+"""
+import os
+import tempfile
+import threading
+import psutil
+
+# Third-party trackers and embeds the calculator does not need
+BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*connect.facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*bat.bing.com*",
+    "*linkedin.com*",
+    "*hs-analytics.net*",
+    "*youtube.com*",
+    "*vimeo.com*"
+]
+
+# Network.setBlockedURLs only takes URL patterns, so resource types are matched by URL
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*"]
+}
+
+PAGE_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    transferred: resources.reduce((total, entry) => total + (entry.transferSize || 0),
+                                  navigation ? navigation.transferSize : 0),
+    requests: resources.length + 1,
+    from_cache: resources.filter(entry => entry.transferSize === 0 && entry.decodedBodySize > 0).length,
+    dom_ready_ms: navigation ? navigation.domContentLoadedEventEnd : null
+};
+"""
+
+PENDING = "pending"
+
+
+class NetworkPolicy:
+    def __init__(self, blocked_patterns=None, blocked_types=("image", "font", "media"),
+                 cache_root=None, cache_size_mb=200):
+        """Resource policy shared by every browser of a scraper
+
+        cache_root=False disables the persistent disk cache.
+        """
+        self.blocked_patterns = list(BLOCKED_URL_PATTERNS if blocked_patterns is None else blocked_patterns)
+        for resource_type in blocked_types:
+            self.blocked_patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+        if cache_root is None:
+            cache_root = os.path.join(tempfile.gettempdir(), "terrapass_chrome_cache")
+        self.cache_root = cache_root
+        self.cache_size_mb = cache_size_mb
+        self.lock = threading.Lock()
+        self.leases = {}  # cache dir -> chromedriver pid, or PENDING while the browser starts
+        self.sessions = []  # (label, seconds to calculator ready, page stats)
+
+    def lease_cache_dir(self):
+        """Reserve a cache dir no running browser is using
+
+        Chrome cannot share one disk cache between processes, so each browser
+        gets its own dir under cache_root. Dirs are reused across runs, which
+        keeps the cache warm.
+        """
+        if not self.cache_root:
+            return None
+        with self.lock:
+            index = 1
+            while True:
+                path = os.path.join(self.cache_root, f"worker{index}")
+                owner = self.leases.get(path)
+                if owner is None or (owner != PENDING and not psutil.pid_exists(owner)):
+                    self.leases[path] = PENDING
+                    os.makedirs(path, exist_ok=True)
+                    return path
+                index += 1
+
+    def release_cache_dir(self, cache_dir):
+        """Give a dir back when its browser failed to start"""
+        with self.lock:
+            self.leases.pop(cache_dir, None)
+
+    def bind_cache_dir(self, cache_dir, pid):
+        """Tie a leased dir to the process using it; it is free again once that process is gone"""
+        with self.lock:
+            self.leases[cache_dir] = pid
+
+    def chrome_arguments(self, cache_dir):
+        if not cache_dir:
+            return []
+        return [f"--disk-cache-dir={cache_dir}", f"--disk-cache-size={self.cache_size_mb * 1024 * 1024}"]
+
+    def apply(self, driver, cache_dir=None):
+        """Turn on request blocking for a started browser and bind its cache dir"""
+        if cache_dir:
+            try:
+                self.bind_cache_dir(cache_dir, driver.service.process.pid)
+            except AttributeError:
+                self.release_cache_dir(cache_dir)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_patterns})
+        except Exception as e:
+            print(f"Could not apply network policy: {e}")
+
+    def record_session(self, driver, label, seconds):
+        """Record bytes transferred and ready time once a session reached the calculator"""
+        try:
+            stats = driver.execute_script(PAGE_STATS_SCRIPT)
+        except Exception:
+            stats = {}
+        with self.lock:
+            self.sessions.append((label, seconds, stats))
+
+    def report(self):
+        """Print transfer and page-ready statistics per session"""
+        with self.lock:
+            sessions = list(self.sessions)
+        if not sessions:
+            return
+
+        print(f"\nNetwork policy: {len(self.blocked_patterns)} blocked patterns, "
+              f"disk cache {'under ' + self.cache_root if self.cache_root else 'disabled'}")
+        print(f"{'Session':<16} {'Ready s':>8} {'KB':>9} {'Requests':>9} {'Cached':>7}")
+        for label, seconds, stats in sessions:
+            print(f"{label:<16} {seconds:>8.2f} {stats.get('transferred', 0) / 1024:>9.1f} "
+                  f"{stats.get('requests', 0):>9} {stats.get('from_cache', 0):>7}")
+        total = sum(stats.get('transferred', 0) for _, _, stats in sessions)
+        average = sum(seconds for _, seconds, _ in sessions) / len(sessions)
+        print(f"Total transferred: {total / 1024:.1f} KB, average ready time {average:.2f}s")
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Process-pool execution mode
+Each worker runs in its own process with its own browser and streams its
+results back to the parent over a queue. The parent keeps the results, the
+rows file and the journal, and restarts a worker process that crashes
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+from browser_recycling import RecyclePolicy
+from network_policy import NetworkPolicy
+from rate_limiter import RateLimiter
+from regions import region_label
+
+
+class ProcessPool:
+    def __init__(self, scraper, processes=4, max_restarts=None):
+        """Run scraper's workers in processes instead of threads
+
+        The parent scraper's settings are copied into each worker process.
+        The rate limit is split evenly between the processes so the combined
+        rate stays the same. A crashed process is replaced up to
+        max_restarts times (default: twice per process).
+        """
+        self.scraper = scraper
+        self.processes = processes
+        self.max_restarts = processes * 2 if max_restarts is None else max_restarts
+        self.context = multiprocessing.get_context("spawn")
+        self.result_queue = self.context.Queue()
+        self.queued = self.context.Value("i", 0)  # Countries still waiting in the parent's queue
+        self.workers = {}  # worker id -> Process
+        self.inboxes = {}  # worker id -> queue the parent sends its next country to
+        self.exited = set()  # Workers that finished normally
+        self.assignments = {}  # worker id -> (country, ticket) it is working on
+        self.tickets = itertools.count(1)  # Tell an assignment from an earlier one of the same worker id
+        self.restarts = 0
+        self.max_retries = 0
+
+    def worker_options(self, worker_id):
+        scraper = self.scraper
+        policy = scraper.network_policy
+        limiter = scraper.rate_limiter
+        recycle = scraper.recycle_policy or RecyclePolicy()
+        return {
+            "max_retries": self.max_retries,
+            "scraper": {
+                "output_prefix": scraper.output_prefix,
+                "human_pacing": scraper.human_pacing,
+                "state_check_timeout": scraper.state_check_timeout,
+                "probe_mode": scraper.probe_mode,
+                "batched_steps": scraper.batched_steps,
+                "state_sweep": scraper.state_sweep
+            },
+            # Cache leases are tracked per process, so each process gets a cache root of its own
+            "network": {
+                "blocked_patterns": policy.blocked_patterns,
+                "blocked_types": (),
+                "cache_root": os.path.join(policy.cache_root, f"process{worker_id}") if policy.cache_root else False,
+                "cache_size_mb": policy.cache_size_mb
+            },
+            "rate": {
+                "rate": limiter.rate / self.processes if limiter.rate else None,
+                "burst": max(1, limiter.burst // self.processes)
+            },
+            "recycle": {
+                "max_rss_mb": recycle.max_rss_mb,
+                "max_slowdown": recycle.max_slowdown,
+                "baseline_countries": recycle.baseline_countries,
+                "window": recycle.window
+            }
+        }
+
+    def start_worker(self, worker_id, electricity_values):
+        # A fresh inbox, so a replacement never sees what its predecessor left behind
+        inbox = self.context.Queue()
+        process = self.context.Process(
+            target=process_worker,
+            args=(self.scraper.profile, self.worker_options(worker_id), electricity_values, worker_id,
+                  inbox, self.result_queue, self.queued),
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.inboxes[worker_id] = inbox
+        print(f"[Process {worker_id}] Started (pid {process.pid})")
+
+    def dispatch(self, work_queue):
+        """Hand the next country to every worker that has none
+
+        Countries are assigned one at a time, so the parent always knows
+        which country to re-queue when a worker process dies.
+        """
+        for worker_id in self.workers:
+            if worker_id in self.assignments:
+                continue
+            country = work_queue.get(timeout=0)
+            if country is None:
+                break
+            ticket = next(self.tickets)
+            self.assignments[worker_id] = (country, ticket)
+            self.inboxes[worker_id].put((country, dict(self.scraper.results.get(country, {})), ticket))
+        self.queued.value = work_queue.remaining()
+
+    def handle(self, message, work_queue):
+        scraper = self.scraper
+        kind, worker_id = message[0], message[1]
+        if kind == "result":
+            _, _, country, kwh, value = message
+            with scraper.lock:
+                merged = dict(scraper.results.get(country, {}))
+                merged[kwh] = value
+                scraper.results[country] = {key: merged[key] for key in sorted(merged)}
+            scraper.record_result(country, kwh, value)
+        elif kind == "states_required":
+            country = message[2]
+            with scraper.lock:
+                if country not in scraper.states_required_countries:
+                    scraper.states_required_countries.append(country)
+            if scraper.journal:
+                scraper.journal.record_states_required(country)
+        elif kind == "states":
+            _, _, country, states = message
+            with scraper.lock:
+                scraper.country_states[country] = states
+            if scraper.journal:
+                scraper.journal.record_states(country, states)
+        elif kind == "queued":
+            work_queue.put(message[2])
+        elif kind == "factor":
+            _, _, country, factor = message
+            with scraper.lock:
+                scraper.emission_factors[country] = factor
+            if scraper.journal:
+                scraper.journal.record_factor(country, factor)
+        elif kind in ("done", "failed"):
+            _, _, country, ticket = message
+            if self.assignments.get(worker_id) != (country, ticket):
+                # Sent by a process that was already handled as crashed, its country re-queued
+                return
+            del self.assignments[worker_id]
+            if kind == "done":
+                work_queue.done(country)
+            else:
+                self.retry(country, work_queue)
+        elif kind == "timings":
+            scraper.timer.merge(message[2], tab_prefix="p")
+        elif kind == "exit":
+            self.exited.add(worker_id)
+
+    def retry(self, country, work_queue):
+        """Re-queue a failed country or give up on it; the parent keeps the retry accounting"""
+        if work_queue.retry(country):
+            self.scraper.timer.count("retry")
+            print(f"[Parent] Re-queued {region_label(country)} for retry")
+        else:
+            self.scraper.timer.count("gave_up")
+            print(f"[Parent] Giving up on {region_label(country)} after {work_queue.max_retries} retries")
+
+    def check_workers(self, work_queue, electricity_values):
+        """Re-queue the country of a crashed worker and start a replacement"""
+        for worker_id, process in list(self.workers.items()):
+            if process.is_alive() or worker_id in self.exited:
+                continue
+            del self.workers[worker_id]
+            del self.inboxes[worker_id]
+            print(f"[Process {worker_id}] Exited unexpectedly (exit code {process.exitcode})")
+            self.scraper.timer.count("crash")
+            assignment = self.assignments.pop(worker_id, None)
+            if assignment is not None:
+                self.retry(assignment[0], work_queue)
+            if self.restarts >= self.max_restarts:
+                print(f"[Process {worker_id}] Not restarted, {self.max_restarts} restarts used up")
+                continue
+            self.restarts += 1
+            self.start_worker(worker_id, electricity_values)
+
+    def run(self, work_queue, electricity_values):
+        """Process the work queue until every country is done or has failed"""
+        self.max_retries = work_queue.max_retries
+        for worker_id in range(1, self.processes + 1):
+            self.start_worker(worker_id, electricity_values)
+
+        try:
+            while True:
+                self.dispatch(work_queue)
+                if work_queue.in_flight == 0 and not work_queue.remaining():
+                    break
+                try:
+                    self.handle(self.result_queue.get(timeout=1), work_queue)
+                except queue.Empty:
+                    pass
+                # Every pass, so a crash is noticed while other workers keep the queue busy
+                self.check_workers(work_queue, electricity_values)
+                if not self.workers:
+                    print(f"No worker processes left, stopping with {work_queue.remaining()} countries unprocessed")
+                    break
+        finally:
+            for inbox in self.inboxes.values():
+                inbox.put(None)
+            # Collect the final timings before the workers go away
+            deadline = time.time() + 30
+            while any(worker_id not in self.exited for worker_id in self.workers) and time.time() < deadline:
+                try:
+                    self.handle(self.result_queue.get(timeout=1), work_queue)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in self.workers.values()):
+                        break
+            for process in self.workers.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        print(f"Worker processes restarted: {self.restarts}")
+
+
+class ProcessWorkQueue:
+    def __init__(self, inbox, result_queue, queued, worker_id, max_retries):
+        """The CountryWorkQueue interface worker_tab expects, backed by the parent's queues"""
+        self.inbox = inbox
+        self.result_queue = result_queue
+        self.queued = queued
+        self.worker_id = worker_id
+        self.max_retries = max_retries
+        self.scraper = None
+        self.ticket = None  # Of the country being worked on, echoed back with its outcome
+
+    def get(self, timeout=None):
+        task = self.inbox.get()
+        if task is None:
+            return None
+        country, results, self.ticket = task
+        # Only the values still missing are measured
+        self.scraper.results[country] = results
+        return country
+
+    def put(self, region):
+        """New work, e.g. the states of a country; the parent queues it"""
+        self.result_queue.put(("queued", self.worker_id, region))
+
+    def done(self, country):
+        self.result_queue.put(("done", self.worker_id, country, self.ticket))
+
+    def retry(self, country):
+        """Report the failure; returns None since the parent decides whether the country is re-queued"""
+        self.result_queue.put(("failed", self.worker_id, country, self.ticket))
+        return None
+
+    def kwh_values(self, country, electricity_values):
+        return electricity_values
+
+    def remaining(self):
+        return self.queued.value
+
+
+class QueueJournal:
+    def __init__(self, result_queue, worker_id):
+        """Journal interface that forwards every event to the parent process"""
+        self.result_queue = result_queue
+        self.worker_id = worker_id
+
+    def record_result(self, country, kwh, value):
+        self.result_queue.put(("result", self.worker_id, country, kwh, value))
+
+    def record_states_required(self, country):
+        self.result_queue.put(("states_required", self.worker_id, country))
+
+    def record_states(self, country, states):
+        self.result_queue.put(("states", self.worker_id, country, list(states)))
+
+    def record_factor(self, country, factor):
+        self.result_queue.put(("factor", self.worker_id, country, factor))
+
+    def record_countries(self, countries):
+        pass
+
+    def close(self):
+        pass
+
+
+def process_worker(profile, options, electricity_values, worker_id, inbox, result_queue, queued):
+    """Entry point of a worker process: one worker_tab driving its own browser"""
+    from scraper_engine import CalculatorScraper
+
+    scraper = CalculatorScraper(profile, network_policy=NetworkPolicy(**options["network"]),
+                                rate_limiter=RateLimiter(**options["rate"]), **options["scraper"])
+    scraper.recycle_policy = RecyclePolicy(**options["recycle"])
+    scraper.journal = QueueJournal(result_queue, worker_id)
+    work_queue = ProcessWorkQueue(inbox, result_queue, queued, worker_id, options["max_retries"])
+    work_queue.scraper = scraper
+    try:
+        scraper.worker_tab(work_queue, electricity_values, worker_id)
+    finally:
+        result_queue.put(("timings", worker_id, scraper.timer.export()))
+    result_queue.put(("exit", worker_id))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Process-wide request budget
+A token bucket every worker tab goes through before loading the calculator
+or submitting NEXT, so the combined rate against Terrapass stays fixed no
+matter how many tabs run. Limiting is opt-in: pass a rate to turn it on
+"""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, rate=None, burst=4):
+        """Allow rate requests per second on average and up to burst at once
+
+        A rate of None or 0, the default, disables limiting.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "delayed": 0, "wait_time": 0.0}
+
+    def take(self, kind, waited):
+        """Take a token if one is available; returns 0, or the seconds until the next one is due"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.stats["requests"] += 1
+                self.stats[kind] = self.stats.get(kind, 0) + 1
+                if waited:
+                    self.stats["delayed"] += 1
+                    self.stats["wait_time"] += waited
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, kind="request"):
+        """Block until a token is available and take it; returns the seconds waited"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            # Sleep until the next token is due, outside the lock
+            delay = self.take(kind, waited)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, kind="request"):
+        """acquire() for coroutines, waiting without blocking the event loop"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay = self.take(kind, waited)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def report(self):
+        if not self.rate or not self.stats["requests"]:
+            return
+        kinds = ", ".join(f"{count} {kind}" for kind, count in self.stats.items()
+                          if kind not in ("requests", "delayed", "wait_time"))
+        print(f"Rate limit {self.rate:g}/s (burst {self.burst}): {self.stats['requests']} requests ({kinds}), "
+              f"{self.stats['delayed']} delayed for {self.stats['wait_time']:.1f}s in total")
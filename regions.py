@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Country and state work items
+A region is a country name, or a (country, state) pair for countries whose
+calculator asks for a state or province. Both are used as work items and as
+keys of the results
+"""
+
+
+def region_key(country, state=None):
+    """The region for a country, or for one of its states"""
+    return (country, state) if state else country
+
+
+def split_region(region):
+    """Return (country, state) for a region; state is None for a whole country"""
+    if isinstance(region, tuple):
+        return region
+    return region, None
+
+
+def region_label(region):
+    """A region as shown in logs, e.g. 'Canada / Ontario'"""
+    country, state = split_region(region)
+    return f"{country} / {state}" if state else country
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Streaming results sink
+Each (country, state, kWh, value) row is appended to a CSV as soon as it is
+read, and the Excel/CSV tables are built once from that file by a separate
+export step
+"""
+import csv
+import os
+import threading
+import pandas as pd
+from emission_factors import save_factors
+from regions import region_key, split_region
+
+FIELDS = ["Country", "State", "kWh", "lbs CO2e"]
+
+
+class ResultsSink:
+    def __init__(self, filename, append=True):
+        """Open the rows file; append=False starts it over"""
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.rows = 0
+        exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+        self.file = open(filename, "a" if exists else "w", newline="")
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(FIELDS)
+            self.file.flush()
+
+    def write(self, region, kwh, value):
+        """Append one result row for a country or a (country, state) region"""
+        country, state = split_region(region)
+        with self.lock:
+            self.writer.writerow([country, state or "", kwh, value])
+            self.file.flush()
+            self.rows += 1
+
+    def write_many(self, region, results):
+        """Append a row for every {kWh: value} of a region"""
+        country, state = split_region(region)
+        with self.lock:
+            for kwh, value in results.items():
+                self.writer.writerow([country, state or "", kwh, value])
+            self.file.flush()
+            self.rows += len(results)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def load_results(filename):
+    """Read a rows file into {region: {kwh: value}}; later rows win
+
+    Files written before the State column was added are read as country rows.
+    """
+    results = {}
+    if not os.path.exists(filename):
+        return results
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                kwh = int(float(row["kWh"]))
+                value = float(row["lbs CO2e"])
+            except (TypeError, ValueError):
+                continue
+            results.setdefault(region_key(row["Country"], row.get("State")), {})[kwh] = value
+    return results
+
+
+def export_results(rows_file, filename, electricity_values, emission_factors=None):
+    """Build the Excel and CSV tables (one row per country or state) from a rows file"""
+    results = load_results(rows_file)
+    if not results:
+        print("No results to save")
+        return
+
+    data = []
+    for region, country_results in results.items():
+        country, state = split_region(region)
+        row = {'Country': country, 'State': state or ''}
+        for kwh in electricity_values:
+            row[f'{kwh}kwh'] = country_results.get(kwh, 'N/A')
+        data.append(row)
+
+    df = pd.DataFrame(data)
+    df.to_excel(filename, index=False)
+    print(f"Results saved to {filename}")
+
+    csv_filename = filename.replace('.xlsx', '.csv')
+    df.to_csv(csv_filename, index=False)
+    print(f"Results also saved to {csv_filename}")
+
+    if emission_factors is not None:
+        save_factors(emission_factors, filename.replace('.xlsx', '_factors.csv'))
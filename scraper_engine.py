@@ -0,0 +1,1025 @@
+#!/usr/bin/env python3
+"""
+Shared Carbon Calculator Scraper Engine
+One implementation of browser setup, navigation, measurement, recycling and
+result streaming, driven by a CalculatorProfile for each calculator flow
+"""
+import os
+import time
+import random
+import threading
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from country_work_queue import CountryWorkQueue
+from checkpoint_journal import CheckpointJournal
+from browser_tabs import SharedBrowser, TabSession, BACKGROUND_TAB_ARGUMENTS
+from browser_pool import BrowserPool, quit_driver
+from emission_factors import probe_points, fit_factor, is_linear, fill_grid
+from js_step_executor import run_kwh_step
+from dom_waits import electricity_input_ready, select_has_options, result_value_changed, element_enabled, parse_carbon_value, find_displayed
+from dom_snapshot import DOMSnapshot
+from selector_cache import SelectorCache
+from regions import split_region, region_label
+from calculator_page import open_calculator, forget_calculator_url
+from browser_recycling import RecyclePolicy
+from network_policy import NetworkPolicy
+from results_sink import ResultsSink, export_results
+from step_timings import StepTimer
+from rate_limiter import RateLimiter
+from process_pool import ProcessPool
+from session_replay import SessionRecorder, performance_logging
+
+# Override with CHROME_BINARY, or set it empty to use the Chrome chromedriver finds
+CHROME_BINARY = os.environ.get("CHROME_BINARY", "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome")
+PREV_XPATH = "//button[contains(text(), 'Prev')]"
+NEXT_SELECTORS = [
+    "//button[contains(text(), 'NEXT')]",
+    "//button[contains(text(), 'Next')]",
+    "//button[contains(text(), 'next')]"
+]
+COOKIE_ACCEPT_SELECTORS = [
+    "//button[contains(text(), 'Accept')]",
+    "//button[contains(text(), 'Accept All')]",
+    "//button[contains(text(), 'OK')]",
+    "//button[contains(text(), 'Close')]",
+    "//a[contains(text(), 'Accept')]",
+    "//a[contains(text(), 'Close')]"
+]
+# Failed countries in a row after which a worker relaunches its browser
+MAX_CONSECUTIVE_FAILURES = 3
+
+class CalculatorScraper:
+    def __init__(self, profile, output_prefix=None, human_pacing=False, state_check_timeout=0.5,
+                 probe_mode=False, batched_steps=True, network_policy=None, rate_limiter=None,
+                 state_sweep=False):
+        """Initialize a scraper for one calculator profile
+
+        output_prefix names the checkpoint, rows and results files
+        (defaults to the profile name). Every worker goes through
+        rate_limiter before loading the calculator or submitting NEXT (no
+        limit unless one is passed); pass the same RateLimiter to several
+        scrapers to share one budget. With
+        state_sweep, countries that ask for a state are measured once per
+        state option instead of being skipped.
+        """
+        self.profile = profile
+        self.output_prefix = output_prefix or profile.name
+        self.results = {}  # Shared results dictionary
+        self.states_required_countries = []
+        self.lock = threading.Lock()  # Thread safety for shared data
+        self.human_pacing = human_pacing  # Opt-in human-like jitter on top of the DOM waits
+        self.state_check_timeout = state_check_timeout  # How long to watch for a state dropdown
+        self.last_result_text = {}  # Last result text seen per driver session
+        self.probe_mode = probe_mode  # Measure two points and derive the rest of the grid
+        self.emission_factors = {}  # lbs CO2e per kWh for countries that passed the linearity check
+        self.journal = None  # Checkpoint journal for the current run, if enabled
+        self.sink = None  # Rows file results are streamed to during a run
+        self.results_file = None
+        self.electricity_values = None  # kWh grid of the last run, the columns of its export
+        self.batched_steps = batched_steps  # One script round-trip per kWh instead of one call per step
+        self.selector_cache = SelectorCache()  # Fallback selector that matched last, per page state
+        self.recycle_policy = None  # When a worker retires its browser during a run
+        self.network_policy = network_policy or NetworkPolicy()  # Request blocking and disk cache per browser
+        self.pool = None  # Warm browsers, when the run uses a pool
+        self.rate_limiter = rate_limiter or RateLimiter()  # Combined request budget of all workers
+        self.throttled = threading.local()  # Seconds each worker thread has waited on the rate limiter
+        self.timer = StepTimer()  # Per-tab latency of each scraping phase
+        self.timings_file = None
+        self.concurrency = None  # Adaptive worker count, when the run uses it
+        self.stopped_tabs = set()  # Workers that stopped because the target was lowered
+        self.recorder = None  # Session archive being recorded, if any
+        self.state_sweep = state_sweep
+        self.country_states = {}  # country -> state options, for countries measured per state
+
+    def random_delay(self, base_delay, variation=0.2):
+        """Add random variation to delays when human-like pacing is enabled"""
+        if not self.human_pacing:
+            return
+        actual_delay = base_delay + random.uniform(-variation, variation)
+        actual_delay = max(0.1, actual_delay)
+        time.sleep(actual_delay)
+
+    def setup_driver(self, tab_id):
+        """Setup Chrome web driver for a specific tab"""
+        chrome_options = webdriver.ChromeOptions()
+
+        # Headless mode for faster performance
+        chrome_options.add_argument("--headless")
+
+        # Performance optimizations
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+
+        # Additional performance optimizations
+        chrome_options.add_argument("--disable-images")
+        chrome_options.add_argument("--disable-plugins")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-web-security")
+        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        chrome_options.add_argument("--memory-pressure-off")
+        chrome_options.add_argument("--max_old_space_size=4096")
+        for argument in BACKGROUND_TAB_ARGUMENTS:
+            chrome_options.add_argument(argument)
+
+        # Persistent disk cache of its own, request blocking once started
+        cache_dir = self.network_policy.lease_cache_dir()
+        for argument in self.network_policy.chrome_arguments(cache_dir):
+            chrome_options.add_argument(argument)
+
+        # Set Chrome binary path (macOS by default)
+        if CHROME_BINARY:
+            chrome_options.binary_location = CHROME_BINARY
+        if self.recorder:
+            performance_logging(chrome_options)
+
+        try:
+            with self.timer.measure("driver_start"):
+                driver = webdriver.Chrome(options=chrome_options)
+        except Exception as e:
+            print(f"Error with ChromeDriver: {e}")
+            print("Please make sure Chrome browser is installed and ChromeDriver is available")
+            self.network_policy.release_cache_dir(cache_dir)
+            raise
+
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        self.network_policy.apply(driver, cache_dir)
+        # Room for the batched kWh step, which waits in the page several times
+        driver.set_script_timeout(30)
+        wait = WebDriverWait(driver, 5)
+
+        return driver, wait
+
+    def throttle(self, kind):
+        """Wait for the shared rate limiter before a page load or NEXT submission"""
+        waited = self.rate_limiter.acquire(kind)
+        if waited:
+            self.timer.record("rate_limit", waited)
+            self.throttled.seconds = self.throttled_seconds() + waited
+
+    def throttled_seconds(self):
+        """Total time the calling worker has waited on the rate limiter"""
+        return getattr(self.throttled, "seconds", 0.0)
+
+    def navigate_to_calculator(self, driver, wait):
+        """Open the calculator and click through the profile's navigation"""
+        # Open the calculator document directly instead of the page that frames it
+        try:
+            self.throttle("page_load")
+            open_calculator(driver, wait)
+            self.random_delay(1.5)
+
+            for state, selectors in self.profile.navigation:
+                _, button = self.selector_cache.find(
+                    state, selectors,
+                    lambda selector: wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
+                )
+                if not button:
+                    # Continue anyway, maybe we're already in the right section
+                    print(f"Could not find the '{state}' button")
+                    break
+                button.click()
+                self.random_delay(1.5)
+
+        except TimeoutException:
+            print("Could not open calculator")
+            raise
+
+        # Ready once the country dropdown has been populated
+        try:
+            wait.until(select_has_options("country"))
+        except TimeoutException:
+            print("Country dropdown did not load")
+            # The calculator may have moved, look its URL up again next time
+            forget_calculator_url()
+
+    def open_session(self, driver, wait, label):
+        """Navigate a new browser or tab to the calculator and record its load statistics"""
+        start_time = time.time()
+        with self.timer.measure("navigate"):
+            self.navigate_to_calculator(driver, wait)
+        self.network_policy.record_session(driver, label, time.time() - start_time)
+        if self.recorder:
+            self.recorder.capture(driver, f"{label} calculator")
+
+    def launch_calculator(self):
+        """Start a browser parked inside the calculator, for the browser pool"""
+        self.timer.set_tab("pool")
+        driver, wait = self.setup_driver("pool")
+        try:
+            self.open_session(driver, wait, f"pool{len(self.network_policy.sessions) + 1}")
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    def driver_healthy(self, driver):
+        """Whether a driver responds and is still on the calculator document"""
+        ready_state, has_form = driver.execute_script(
+            "return [document.readyState, !!document.querySelector('select, input')]"
+        )
+        return ready_state == "complete" and has_form
+
+    def handle_cookie_banner(self, driver):
+        """Handle cookie banner if present"""
+        try:
+            cookie_banner = driver.find_element(By.ID, "ifrmCookieBanner")
+            if cookie_banner.is_displayed():
+                driver.switch_to.frame(cookie_banner)
+
+                _, accept_button = self.selector_cache.find(
+                    "cookie_accept", COOKIE_ACCEPT_SELECTORS,
+                    lambda selector: find_displayed(driver, By.XPATH, selector)
+                )
+                if accept_button:
+                    accept_button.click()
+
+                # Switch back to the calculator document
+                driver.switch_to.default_content()
+                self.random_delay(0.5)
+        except:
+            pass
+
+    def click_next(self, driver, wait):
+        """Click the NEXT button"""
+        with self.timer.measure("click_next") as step:
+            try:
+                # Handle cookie banner first
+                self.handle_cookie_banner(driver)
+
+                _, next_button = self.selector_cache.find(
+                    "next", NEXT_SELECTORS,
+                    lambda selector: wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
+                )
+
+                if next_button:
+                    driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
+                    self.random_delay(0.3)
+                    self.throttle("next")
+
+                    try:
+                        next_button.click()
+                    except:
+                        driver.execute_script("arguments[0].click();", next_button)
+
+                    self.random_delay(1)
+                    return True
+                else:
+                    # Every selector timed out waiting to become clickable
+                    step.timeout = True
+                    return False
+            except Exception as e:
+                return False
+
+    def get_carbon_footprint(self, driver, wait):
+        """Extract the carbon footprint value once the result text has updated"""
+        self.random_delay(1.5)
+        previous_text = self.last_result_text.get(driver.session_id)
+
+        # One wait covers every selector instead of a full timeout per selector,
+        # with the one that matched last checked first
+        xpaths = self.selector_cache.ordered("result", self.profile.result_xpaths)
+        condition = result_value_changed(xpaths, previous_text)
+        try:
+            with self.timer.measure("result_wait"):
+                text = wait.until(condition)
+            self.selector_cache.record_match("result", xpaths, condition.matched_xpath)
+        except TimeoutException:
+            # Text that never changed from the last reading is most likely the
+            # previous kWh value's result, so leave this value to be retried
+            return None
+
+        self.last_result_text[driver.session_id] = text
+        return parse_carbon_value(text)
+
+    def find_electricity_input(self, driver, wait=None):
+        """Find the electricity input field, waiting for it to render when a wait is given"""
+        condition = electricity_input_ready(self.profile.input_selectors)
+        try:
+            if wait:
+                return wait.until(condition)
+            return condition(driver) or None
+        except TimeoutException:
+            return None
+        except Exception as e:
+            print(f"Error finding electricity input: {e}")
+            return None
+
+    def modify_electricity_input(self, driver, kwh_value, wait=None):
+        """Modify the electricity input value directly using JavaScript"""
+        with self.timer.measure("input_modify"):
+            try:
+                # Always find the input field fresh to avoid stale element issues
+                electricity_input = self.find_electricity_input(driver, wait)
+                if not electricity_input:
+                    return False
+
+                # Clear and set new value using JavaScript
+                driver.execute_script("arguments[0].value = '';", electricity_input)
+                driver.execute_script(f"arguments[0].value = '{kwh_value}';", electricity_input)
+
+                # Trigger change events
+                driver.execute_script("""
+                    arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
+                    arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
+                """, electricity_input)
+
+                self.random_delay(0.5)
+                return True
+
+            except Exception as e:
+                print(f"Error modifying electricity input: {e}")
+                return False
+
+    def test_country_all_kwh(self, region, electricity_values, driver, wait, tab_id):
+        """Test a country, or a (country, state) region, with all kWh values using smart input modification"""
+        country_name, state_name = split_region(region)
+        print(f"[Tab {tab_id}] Testing country: {region_label(region)}")
+
+        # Try to find country dropdown
+        try:
+            country_dropdown = driver.find_element(By.CSS_SELECTOR, "select[name='country']")
+        except:
+            # Navigate back to country selection
+            print(f"[Tab {tab_id}] Navigating back to country selection...")
+            with self.timer.measure("prev") as step:
+                for attempt in range(3):
+                    try:
+                        prev_button = wait.until(element_enabled(PREV_XPATH))
+                        prev_button.click()
+                        self.random_delay(0.3)
+
+                        try:
+                            country_dropdown = wait.until(
+                                EC.presence_of_element_located((By.CSS_SELECTOR, "select[name='country']"))
+                            )
+                            break
+                        except TimeoutException:
+                            continue
+                    except:
+                        step.timeout = True
+                        return None
+                else:
+                    step.timeout = True
+                    return None
+
+        # Select country once the options have loaded
+        with self.timer.measure("country_select") as step:
+            try:
+                self.random_delay(1)
+                try:
+                    snapshot = wait.until(select_has_options("country", country_name))
+                except TimeoutException:
+                    step.timeout = True
+                    snapshot = DOMSnapshot.take(driver)
+
+                # Options are read from the snapshot; only the click goes to the browser
+                option_node = snapshot.option("country", country_name)
+                option = snapshot.element(driver, option_node)
+                if not option:
+                    available_options = snapshot.options("country")
+                    print(f"[Tab {tab_id}] Country '{country_name}' not found in dropdown. Available options: {available_options[:5]}...")
+                    return None
+
+                option.click()
+                if state_name and snapshot.selected("country", option_node):
+                    # Clicking the country that is already selected does not fire change, which
+                    # the page needs to show the state dropdown again
+                    driver.execute_script(
+                        "arguments[0].closest('select').dispatchEvent(new Event('change', {bubbles: true}));", option
+                    )
+                self.random_delay(1)
+            except Exception as e:
+                print(f"[Tab {tab_id}] Error selecting country {country_name}: {e}")
+                return None
+
+        if state_name:
+            if not self.select_state(state_name, driver, wait, tab_id):
+                return None
+        else:
+            # Check for state requirement, giving the dropdown a short window to populate
+            try:
+                snapshot = WebDriverWait(driver, self.state_check_timeout, poll_frequency=0.1).until(
+                    select_has_options("state")
+                )
+                print(f"[Tab {tab_id}] Country {country_name} requires state selection")
+                if self.state_sweep:
+                    self.record_country_states(country_name, snapshot.choices("state"), tab_id)
+                    return None
+                with self.lock:
+                    if country_name not in self.states_required_countries:
+                        self.states_required_countries.append(country_name)
+                if self.journal:
+                    self.journal.record_states_required(country_name)
+                return None
+            except TimeoutException:
+                pass
+
+        # Click NEXT to electricity input (only once)
+        if not self.click_next(driver, wait):
+            return None
+
+        return self.measure_country(region, electricity_values, driver, wait, tab_id)
+
+    def select_state(self, state_name, driver, wait, tab_id):
+        """Pick a state in the state dropdown of the selected country"""
+        with self.timer.measure("state_select") as step:
+            try:
+                snapshot = wait.until(select_has_options("state", state_name))
+            except TimeoutException:
+                step.timeout = True
+                print(f"[Tab {tab_id}] State '{state_name}' not found in dropdown")
+                return False
+            option = snapshot.element(driver, snapshot.option("state", state_name))
+            if not option:
+                return False
+            option.click()
+            self.random_delay(1)
+            return True
+
+    def record_country_states(self, country_name, states, tab_id):
+        """Remember a country's state options so each state is queued as a work item of its own"""
+        print(f"[Tab {tab_id}] Sweeping {len(states)} states of {country_name}")
+        with self.lock:
+            self.country_states[country_name] = list(states)
+        if self.journal:
+            self.journal.record_states(country_name, states)
+
+    def measure_kwh_values(self, region, kwh_values, driver, wait, tab_id):
+        """Measure each kWh value using smart input modification, starting from the energy section"""
+        country_results = {}
+        # Human-like pacing needs the step-by-step path to insert its delays, and a
+        # tab of a shared browser would hold the browser lock for the whole script
+        use_script = self.batched_steps and not self.human_pacing and not isinstance(driver, TabSession)
+
+        for kwh in kwh_values:
+            print(f"[Tab {tab_id}]   Testing {kwh} kWh...")
+            carbon_value = None
+            stage = "input"
+            start_time = time.perf_counter()
+
+            if use_script:
+                # The batched step submits NEXT once
+                self.throttle("next")
+                with self.timer.measure("kwh_step") as timed:
+                    step = run_kwh_step(driver, kwh, self.selector_cache.ordered("result", self.profile.result_xpaths),
+                                        self.last_result_text.get(driver.session_id),
+                                        input_xpaths=self.profile.input_selectors)
+                    timed.timeout = "timed out" in (step.get("error") or "")
+                if step.get("text"):
+                    self.last_result_text[driver.session_id] = step["text"]
+                carbon_value = step.get("value")
+                stage = step.get("stage", "input")
+                if not step.get("ok"):
+                    # Finish this value step by step from wherever the script stopped
+                    print(f"[Tab {tab_id}]     Batched step stopped at '{stage}' ({step.get('error')}), switching to individual steps")
+                    use_script = False
+
+            if stage in ("input", "next"):
+                # Modify input value directly
+                if not self.modify_electricity_input(driver, kwh, wait):
+                    continue
+
+                # Click NEXT to see results
+                if not self.click_next(driver, wait):
+                    continue
+                stage = "result"
+
+            if stage == "result":
+                # Get carbon footprint
+                carbon_value = self.get_carbon_footprint(driver, wait)
+                stage = "prev"
+
+            if carbon_value is not None:
+                # Time from starting the value until its result was read
+                self.timer.record("measurement", time.perf_counter() - start_time)
+                country_results[kwh] = carbon_value
+                print(f"[Tab {tab_id}]     Result: {carbon_value} lbs CO2e")
+                self.record_result(region, kwh, carbon_value)
+            else:
+                print(f"[Tab {tab_id}]     No result found")
+            if self.recorder:
+                self.recorder.capture(driver, f"{region_label(region)} {kwh} kWh" + ("" if carbon_value is not None else " no result"))
+
+            # Go back to energy section for next test
+            if stage == "prev":
+                try:
+                    with self.timer.measure("prev"):
+                        prev_button = wait.until(element_enabled(PREV_XPATH))
+                        prev_button.click()
+                        self.random_delay(0.5)
+                except:
+                    break
+
+        return country_results
+
+    def record_result(self, region, kwh, value):
+        """Stream one result to the rows file and the checkpoint journal"""
+        if self.sink:
+            self.sink.write(region, kwh, value)
+        if self.journal:
+            self.journal.record_result(region, kwh, value)
+
+    def measure_country(self, region, electricity_values, driver, wait, tab_id):
+        """Measure the kWh grid for the selected country or state
+
+        In probe mode only two points are measured and the rest of the grid is
+        derived from the fitted emission factor. If the points are not linear
+        the remaining values are measured as usual.
+        """
+        if not self.probe_mode:
+            return self.measure_kwh_values(region, electricity_values, driver, wait, tab_id)
+
+        measured = self.measure_kwh_values(region, probe_points(electricity_values), driver, wait, tab_id)
+        factor = fit_factor(measured)
+        if len(measured) == 2 and is_linear(measured, factor):
+            with self.lock:
+                self.emission_factors[region] = factor
+            print(f"[Tab {tab_id}]   {region_label(region)}: {factor:.6f} lbs CO2e/kWh, derived {len(electricity_values) - len(measured)} values")
+            country_results = fill_grid(factor, electricity_values, measured)
+            if self.journal:
+                self.journal.record_factor(region, factor)
+            for kwh, value in country_results.items():
+                if kwh not in measured:
+                    self.record_result(region, kwh, value)
+            return country_results
+
+        print(f"[Tab {tab_id}]   {region_label(region)} could not be confirmed linear, running full sweep")
+        remaining = [kwh for kwh in electricity_values if kwh not in measured]
+        measured.update(self.measure_kwh_values(region, remaining, driver, wait, tab_id))
+        return {kwh: measured[kwh] for kwh in electricity_values if kwh in measured}
+
+    def replace_driver(self, driver, tab_id, unhealthy=False):
+        """Swap a worker's browser for a fresh one parked in the calculator"""
+        if self.pool is not None:
+            driver = self.pool.replace(driver, unhealthy=unhealthy)
+            return driver, WebDriverWait(driver, 5)
+        quit_driver(driver)
+        driver, wait = self.setup_driver(tab_id)
+        self.open_session(driver, wait, f"tab{tab_id}")
+        return driver, wait
+
+    def worker_tab(self, work_queue, electricity_values, tab_id, session=None):
+        """Worker function for each tab, pulling countries from the shared queue
+
+        With a session the worker drives one tab of a shared browser. With a
+        pool it takes a warm browser from it, otherwise it starts a browser of
+        its own.
+        """
+        print(f"[Tab {tab_id}] Starting worker...")
+        self.timer.set_tab(tab_id)
+
+        if session is not None:
+            # Tabs of a shared browser cannot be recycled on their own
+            driver, wait = session, WebDriverWait(session, 5)
+            monitor = None
+            # Request blocking is set per tab
+            self.network_policy.apply(driver)
+        elif self.pool is not None:
+            driver = self.pool.acquire()
+            wait = WebDriverWait(driver, 5)
+            monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+        else:
+            driver, wait = self.setup_driver(tab_id)
+            monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+        completed = 0
+        failures = 0  # Countries in a row that failed on this tab
+
+        try:
+            if self.pool is None or session is not None:
+                self.open_session(driver, wait, f"tab{tab_id}")
+
+            while True:
+                if self.concurrency and not self.concurrency.admit(tab_id):
+                    print(f"[Tab {tab_id}] Stopping, concurrency lowered to {self.concurrency.target}")
+                    self.stopped_tabs.add(tab_id)
+                    break
+                region = work_queue.get()
+                if region is None:
+                    break
+
+                start_time = time.time()
+                start_throttled = self.throttled_seconds()
+                try:
+                    print(f"[Tab {tab_id}] Processing {region_label(region)} ({work_queue.remaining()} left in queue)")
+
+                    # Only measure what an earlier, interrupted run did not finish
+                    pending_values = self.missing_kwh_values(region, work_queue.kwh_values(region, electricity_values))
+                    results = self.test_country_all_kwh(region, pending_values, driver, wait, tab_id)
+                    # Waiting on the rate limiter is not the browser or the site slowing down
+                    busy_time = time.time() - start_time - (self.throttled_seconds() - start_throttled)
+                    if self.concurrency:
+                        self.concurrency.record(busy_time, len(results or {}),
+                                                bool(results) or region in self.states_required_countries
+                                                or region in self.country_states)
+                    if results:
+                        # Save tab results thread-safely
+                        with self.lock:
+                            merged = dict(self.results.get(region, {}))
+                            merged.update(results)
+                            self.results[region] = {kwh: merged[kwh] for kwh in sorted(merged)}
+                        completed += 1
+                        failures = 0
+                        work_queue.done(region)
+                    elif region in self.country_states:
+                        failures = 0
+                        # Each state goes back on the queue as a work item of its own
+                        for state_region in self.state_regions(region, electricity_values):
+                            work_queue.put(state_region)
+                        work_queue.done(region)
+                    elif region in self.states_required_countries:
+                        # Not a failure, retrying would give the same answer
+                        failures = 0
+                        work_queue.done(region)
+                    else:
+                        self.retry_region(work_queue, region, tab_id, "No results for")
+                        failures += 1
+
+                    if monitor is None:
+                        continue
+                    # Recycle the browser once it leaks memory or slows down
+                    reason = monitor.sample(busy_time, len(results or {}))
+                    if reason:
+                        self.timer.count("recycle")
+                        print(f"[Tab {tab_id}] Recycling browser: {reason}")
+                        driver, wait = self.replace_driver(driver, tab_id)
+                        monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+                    elif self.pool is not None and not self.pool.check(driver):
+                        print(f"[Tab {tab_id}] Browser failed health check, swapping in a warm one")
+                        driver, wait = self.replace_driver(driver, tab_id, unhealthy=True)
+                        monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+
+                except Exception as e:
+                    print(f"[Tab {tab_id}] Error processing {region_label(region)}: {e}")
+                    self.timer.count("error")
+                    if self.concurrency:
+                        busy_time = time.time() - start_time - (self.throttled_seconds() - start_throttled)
+                        self.concurrency.record(busy_time, 0, False)
+                    self.retry_region(work_queue, region, tab_id, "Error on")
+                    failures += 1
+                    if self.pool is not None and session is None:
+                        # Recover by swapping in a warm driver
+                        try:
+                            driver, wait = self.replace_driver(driver, tab_id, unhealthy=True)
+                            monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+                            failures = 0
+                        except Exception as recovery_error:
+                            print(f"[Tab {tab_id}] Failed to recover driver: {recovery_error}")
+                            break
+
+                if failures and (self.pool is None or session is not None):
+                    # Without a pool nothing else notices a browser that died
+                    replacement = self.recover_tab(driver, wait, tab_id, session, failures)
+                    if replacement is None:
+                        break
+                    if replacement[0] is not driver:
+                        driver, wait = replacement
+                        monitor = self.recycle_policy.monitor(driver, f"tab{tab_id}")
+                        failures = 0
+
+        finally:
+            if session is not None:
+                driver.quit()
+            else:
+                quit_driver(driver)
+
+        print(f"[Tab {tab_id}] Completed! Processed {completed} countries")
+
+    def recover_tab(self, driver, wait, tab_id, session, failures):
+        """Keep or relaunch a worker's browser after a failed country
+
+        The browser is relaunched once it stops responding or failures
+        countries in a row failed on it, so a dead tab stops using up the
+        retries of the countries it pulls. A tab of a shared browser cannot
+        be relaunched on its own and stops instead. Returns (driver, wait),
+        or None when the worker should stop.
+        """
+        try:
+            self.driver_healthy(driver)
+            responding = True
+        except Exception:
+            responding = False
+        if responding and failures < MAX_CONSECUTIVE_FAILURES:
+            return driver, wait
+        reason = f"{failures} countries in a row failed" if responding else "browser stopped responding"
+        if session is not None:
+            print(f"[Tab {tab_id}] Stopping, {reason}")
+            return None
+        print(f"[Tab {tab_id}] Relaunching browser, {reason}")
+        self.timer.count("relaunch")
+        try:
+            return self.replace_driver(driver, tab_id, unhealthy=True)
+        except Exception as recovery_error:
+            print(f"[Tab {tab_id}] Failed to relaunch browser: {recovery_error}")
+            return None
+
+    def retry_region(self, work_queue, region, tab_id, reason):
+        """Hand a failed region back to the work queue and log what became of it
+
+        A queue whose retry() returns None leaves the decision, and its
+        logging and counting, to its owner, e.g. the parent of a worker process.
+        """
+        requeued = work_queue.retry(region)
+        if requeued is None:
+            print(f"[Tab {tab_id}] {reason} {region_label(region)}, reported the failure")
+        elif requeued:
+            self.timer.count("retry")
+            print(f"[Tab {tab_id}] {reason} {region_label(region)}, re-queued for retry")
+        else:
+            self.timer.count("gave_up")
+            print(f"[Tab {tab_id}] {reason} {region_label(region)}, giving up after {work_queue.max_retries} retries")
+
+    def run_workers(self, work_queue, electricity_values, num_tabs, tabs_per_browser):
+        """Run a fixed number of workers until the queue is drained"""
+        sessions = [None] * num_tabs
+        if tabs_per_browser > 1:
+            sessions = self.open_shared_tabs(num_tabs, tabs_per_browser)
+
+        # Create threads for each tab
+        threads = []
+        for i in range(num_tabs):
+            thread = threading.Thread(
+                target=self.worker_tab,
+                args=(work_queue, electricity_values, i+1, sessions[i])
+            )
+            threads.append(thread)
+
+        # Start all threads with staggered timing
+        for i, thread in enumerate(threads):
+            thread.start()
+            self.random_delay(0.2)
+
+        # Wait for all threads to complete
+        for thread in threads:
+            thread.join()
+
+    def run_adaptive_workers(self, work_queue, electricity_values, concurrency):
+        """Run workers while the controller sizes their number
+
+        Workers above the target stop after their current country; new ones
+        are started while the target is above the number running and work is
+        still queued.
+        """
+        self.concurrency = concurrency
+        self.stopped_tabs = set()
+        threads = {}
+        try:
+            while True:
+                for tab_id in range(1, concurrency.target + 1):
+                    thread = threads.get(tab_id)
+                    if thread is not None and thread.is_alive():
+                        continue
+                    # Start or restart a worker only while work is queued, and only
+                    # restart ones that stopped for a lower target, not ones that crashed
+                    if not work_queue.remaining() or (thread is not None and tab_id not in self.stopped_tabs):
+                        continue
+                    self.stopped_tabs.discard(tab_id)
+                    thread = threading.Thread(target=self.worker_tab, args=(work_queue, electricity_values, tab_id))
+                    threads[tab_id] = thread
+                    thread.start()
+                    self.random_delay(0.2)
+
+                if not any(thread.is_alive() for thread in threads.values()):
+                    break
+                time.sleep(1)
+                concurrency.adjust()
+        finally:
+            for thread in threads.values():
+                thread.join()
+            concurrency.report()
+            self.concurrency = None
+
+    def open_shared_tabs(self, num_tabs, tabs_per_browser):
+        """Start as few browsers as needed and open num_tabs tabs across them"""
+        sessions = []
+        browser_id = 0
+        while len(sessions) < num_tabs:
+            browser_id += 1
+            count = min(tabs_per_browser, num_tabs - len(sessions))
+            driver, _ = self.setup_driver(f"browser{browser_id}")
+            sessions.extend(SharedBrowser(driver).open_tabs(count))
+        print(f"Opened {num_tabs} tabs in {browser_id} browsers")
+        return sessions
+
+    def get_country_list(self):
+        """Read the country list from the dropdown
+
+        Uses a pooled browser when there is a pool, otherwise a temporary one.
+        """
+        if self.pool is not None:
+            driver = self.pool.acquire()
+            wait = WebDriverWait(driver, 5)
+        else:
+            driver, wait = self.setup_driver(0)
+        try:
+            if self.pool is None:
+                self.navigate_to_calculator(driver, wait)
+
+            # Get country list
+            try:
+                snapshot = wait.until(select_has_options("country"))
+                all_countries = snapshot.choices("country")
+                print(f"Found {len(all_countries)} countries")
+
+                if self.journal:
+                    self.journal.record_countries(all_countries)
+
+            except Exception as e:
+                print(f"Error getting country list: {e}")
+                if not self.profile.fallback_countries:
+                    raise
+                all_countries = list(self.profile.fallback_countries)
+                print(f"Using fallback list: {all_countries}")
+
+        finally:
+            if self.pool is not None:
+                self.pool.release(driver)
+            else:
+                driver.quit()
+
+        return all_countries
+
+    def resume_from_checkpoint(self, checkpoint_file):
+        """Open the checkpoint journal and restore finished work from it
+
+        Returns the journaled country list, or None if it still has to be fetched.
+        """
+        if not checkpoint_file:
+            return None
+
+        self.journal = CheckpointJournal(checkpoint_file)
+        state = self.journal.load()
+        self.results.update(state["results"])
+        self.emission_factors.update(state["factors"])
+        self.country_states.update(state["states"])
+        # A state sweep tries the countries an earlier run skipped for needing a state
+        for country in [] if self.state_sweep else state["states_required"]:
+            if country not in self.states_required_countries:
+                self.states_required_countries.append(country)
+
+        if state["results"] or state["states_required"]:
+            print(f"Resuming from {checkpoint_file}: {len(state['results'])} countries with results, "
+                  f"{len(state['states_required'])} requiring state selection")
+        return state["countries"]
+
+    def missing_kwh_values(self, region, electricity_values):
+        """kWh values that have no result yet for a country or state"""
+        done = self.results.get(region, {})
+        return [kwh for kwh in electricity_values if kwh not in done]
+
+    def state_regions(self, country, electricity_values):
+        """The (country, state) work items of a country swept by state that still have values missing"""
+        return [(country, state) for state in self.country_states.get(country, [])
+                if self.missing_kwh_values((country, state), electricity_values)]
+
+    def pending_regions(self, countries, electricity_values):
+        """Work items for a run: countries, or the states of countries swept by state
+
+        Countries that are complete or known to need a state are skipped.
+        """
+        pending = []
+        for country in countries:
+            if country in self.country_states:
+                pending.extend(self.state_regions(country, electricity_values))
+            elif country not in self.states_required_countries and self.missing_kwh_values(country, electricity_values):
+                pending.append(country)
+        return pending
+
+    def run(self, electricity_values=None, num_tabs=20, max_retries=2, tabs_per_browser=1,
+            checkpoint_file=None, countries=None, recycle_policy=None, results_file=None,
+            country_limit=None, pool_spares=None, concurrency=None, processes=None, record=None):
+        """Run the analysis with num_tabs workers pulling countries from a shared queue
+
+        With tabs_per_browser > 1, tabs share browser processes instead of
+        each starting its own Chrome. With pool_spares set, workers take
+        browsers from a pool that keeps that many warm spares parked in the
+        calculator. Progress is journaled to checkpoint_file so a rerun after
+        a crash only does the missing (country, kWh) pairs. countries limits
+        the run to the given names, country_limit to the first few. Workers
+        with their own browser recycle it once recycle_policy sees it cross
+        its memory or slowdown threshold. Results are streamed to
+        results_file as they are read; save_final_results exports them.
+        Step timings are printed at the end and written to
+        <output_prefix>_timings.json. With a ConcurrencyController as
+        concurrency, num_tabs is only the upper bound and the controller
+        decides how many workers run (not with shared tabs). With processes
+        set, that many worker processes replace the threads: each drives its
+        own browser, results stream back over a queue, and a crashed process
+        is restarted with its country re-queued. With record set to a file
+        name, the HTTP traffic and DOM snapshots of the run are saved there
+        for session_replay.py (thread mode only).
+        """
+        electricity_values = electricity_values or self.profile.electricity_values
+        self.electricity_values = list(electricity_values)
+        self.timer = StepTimer()
+        self.timings_file = f"{self.output_prefix}_timings.json"
+        self.recorder = SessionRecorder(record) if record else None
+        self.recycle_policy = recycle_policy or RecyclePolicy()
+        if pool_spares is not None and tabs_per_browser <= 1 and not processes:
+            self.pool = BrowserPool(self.launch_calculator, spares=pool_spares, health_check=self.driver_healthy)
+            self.pool.start()
+
+        try:
+            # Restore finished work from an interrupted run before fetching anything
+            all_countries = self.resume_from_checkpoint(checkpoint_file)
+            if countries is not None:
+                all_countries = list(countries)
+            elif all_countries is None:
+                all_countries = self.get_country_list()
+
+            if country_limit:
+                all_countries = all_countries[:country_limit]
+
+            # Stream results to the rows file, starting with what the journal restored
+            self.results_file = results_file or f"{self.output_prefix}_results_rows.csv"
+            self.sink = ResultsSink(self.results_file, append=False)
+            for country, country_results in self.results.items():
+                self.sink.write_many(country, country_results)
+
+            # Skip countries that are already complete or known to need a state
+            pending = self.pending_regions(all_countries, electricity_values)
+
+            if not pending:
+                print("All countries are already complete, nothing to do")
+                return
+            if not self.state_sweep:
+                # A swept country turns into one work item per state, so keep every tab then
+                num_tabs = min(num_tabs, len(pending))
+
+            # Tabs pull countries from a shared queue so a slow tab never holds up the rest
+            work_queue = CountryWorkQueue(pending, max_retries=max_retries)
+            print(f"Queued {len(pending)} of {len(all_countries)} countries for {num_tabs} tabs")
+
+            if processes:
+                if not self.state_sweep:
+                    processes = min(processes, len(pending))
+                ProcessPool(self, processes).run(work_queue, electricity_values)
+            elif concurrency is not None and tabs_per_browser <= 1:
+                concurrency.limit(num_tabs)
+                self.run_adaptive_workers(work_queue, electricity_values, concurrency)
+            else:
+                self.run_workers(work_queue, electricity_values, num_tabs, tabs_per_browser)
+
+            if work_queue.failed:
+                print(f"Countries that failed after all retries: {', '.join(map(region_label, work_queue.failed))}")
+            print("All tabs completed!")
+
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.report()
+                self.pool = None
+            self.recycle_policy.report()
+            self.network_policy.report()
+            self.rate_limiter.report()
+            self.timer.report(self.timings_file)
+            if self.sink:
+                self.sink.close()
+            if self.journal:
+                self.journal.close()
+            if self.recorder:
+                self.recorder.close()
+                self.recorder = None
+
+    def save_final_results(self, filename=None):
+        """Export the streamed rows of the last run to Excel and CSV"""
+        if not self.results_file:
+            print("No results to save")
+            return
+        filename = filename or f"{self.output_prefix}_results.xlsx"
+        with self.timer.measure("save"):
+            export_results(self.results_file, filename, self.electricity_values or self.profile.electricity_values,
+                           self.emission_factors)
+        # Add the export to the run's timing report
+        self.timer.write(self.timings_file)
+
+    def print_summary(self, title, states_file):
+        """Print the end-of-run summary and write the countries that need a state"""
+        print("\n" + "="*50)
+        print(title)
+        print("="*50)
+
+        states = [region for region in self.results if split_region(region)[1]]
+        print(f"\nCountries with results: {len(self.results) - len(states)}")
+        if self.country_states:
+            print(f"States with results: {len(states)} in {len(self.country_states)} countries")
+        print(f"Countries requiring state selection: {len(self.states_required_countries)}")
+        self.selector_cache.report()
+
+        if self.states_required_countries:
+            print(f"\nCountries requiring state selection:")
+            for country in self.states_required_countries:
+                print(f"  - {country}")
+
+        # Save states required countries
+        if self.states_required_countries:
+            with open(states_file, "w") as f:
+                for country in self.states_required_countries:
+                    f.write(f"{country}\n")
+            print(f"\nStates required countries saved to: {states_file}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Selector hit-cache for the fallback selector lists
+Remembers which selector matched for each page state and tries it first next time
+"""
+import threading
+from selenium.common.exceptions import WebDriverException
+
+
+class SelectorCache:
+    def __init__(self, demote_after=2):
+        """Initialize an empty cache shared by all tabs of a scraper"""
+        self.demote_after = demote_after  # Consecutive misses before a cached selector is dropped
+        self.lock = threading.Lock()
+        self.preferred = {}  # page state -> selector that matched last
+        self.failures = {}  # page state -> consecutive misses of the preferred selector
+        self.stats = {}  # page state -> counters
+
+    def ordered(self, state, selectors):
+        """Selectors for a page state with the cached one first"""
+        with self.lock:
+            preferred = self.preferred.get(state)
+        if preferred in selectors:
+            return [preferred] + [selector for selector in selectors if selector != preferred]
+        return list(selectors)
+
+    def find(self, state, selectors, locate):
+        """Return (selector, element) for the first selector that locate() resolves
+
+        locate(selector) should return the element, or return None / raise a
+        WebDriverException (e.g. TimeoutException) when it does not match.
+        """
+        candidates = self.ordered(state, selectors)
+        for selector in candidates:
+            try:
+                element = locate(selector)
+            except WebDriverException:
+                element = None
+
+            if element:
+                self.record_match(state, candidates, selector)
+                return selector, element
+
+        self.record_match(state, candidates, None)
+        return None, None
+
+    def record_match(self, state, candidates, selector):
+        """Record the outcome of a lookup over candidates (as returned by ordered())
+
+        selector is the one that matched, or None if none did.
+        """
+        with self.lock:
+            cached = self.preferred.get(state)
+        cached = cached if candidates and candidates[0] == cached else None
+        attempts = candidates.index(selector) if selector in candidates else len(candidates)
+        self.record(state, selector, attempts, cached)
+
+    def record(self, state, selector, attempts, cached):
+        """Update the cache and counters after a lookup"""
+        with self.lock:
+            stats = self.stats.setdefault(state, {"lookups": 0, "hits": 0, "misses": 0,
+                                                  "fallback_attempts": 0, "demotions": 0})
+            stats["lookups"] += 1
+            stats["fallback_attempts"] += attempts
+
+            if cached and selector == cached:
+                stats["hits"] += 1
+                self.failures[state] = 0
+                return
+
+            stats["misses"] += 1
+            if cached:
+                # The cached selector went stale; drop it after repeated misses
+                self.failures[state] = self.failures.get(state, 0) + 1
+                if self.failures[state] >= self.demote_after or selector is not None:
+                    del self.preferred[state]
+                    self.failures[state] = 0
+                    stats["demotions"] += 1
+            if selector is not None:
+                self.preferred[state] = selector
+
+    def report(self):
+        """Print hit/miss statistics per page state"""
+        with self.lock:
+            if not self.stats:
+                return
+            print(f"\n{'Selector state':<24} {'Lookups':>8} {'Hits':>6} {'Misses':>7} {'Fallbacks':>10} {'Demoted':>8}  Cached selector")
+            for state, stats in sorted(self.stats.items()):
+                print(f"{state:<24} {stats['lookups']:>8} {stats['hits']:>6} {stats['misses']:>7} "
+                      f"{stats['fallback_attempts']:>10} {stats['demotions']:>8}  {self.preferred.get(state, '-')}")
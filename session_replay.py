@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Record and replay calculator sessions
+Recording captures the HTTP responses of a real run from Chrome's
+performance log, plus DOM snapshots after each measurement, into one zip
+archive. Replay serves the archive from a local server with every recorded
+origin rewritten to it, so any scraper can rerun the session offline and at
+full speed by pointing CALCULATOR_PAGE_URL at the replay page
+"""
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import calculator_page
+
+TEXT_TYPES = ("text/", "javascript", "json", "xml")
+RESPONSE_HEADERS = ("content-type", "cache-control")
+
+
+def performance_logging(chrome_options):
+    """Turn on the performance log a recorder reads the network traffic from"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def request_key(method, url, post_data=None):
+    key = f"{method} {url}"
+    if post_data:
+        key += " " + hashlib.sha1(post_data.encode()).hexdigest()
+    return key
+
+
+class SessionRecorder:
+    def __init__(self, filename, snapshots=True):
+        """Start a session archive
+
+        Response bodies and snapshots are stored once per distinct content.
+        """
+        self.filename = filename
+        self.snapshots = snapshots
+        self.lock = threading.Lock()
+        self.archive = zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED)
+        self.bodies = set()  # Content hashes already in the archive
+        self.responses = []  # {"method", "url", "key", "status", "headers", "body"}
+        self.snapshot_index = []  # {"label", "url", "time", "html"}
+        self.pending = {}  # driver session id -> {request id: request/response seen so far}
+        self.started = time.time()
+
+    def store(self, folder, data):
+        digest = hashlib.sha1(data).hexdigest()
+        name = f"{folder}/{digest}"
+        if name not in self.bodies:
+            self.bodies.add(name)
+            self.archive.writestr(name, data)
+        return name
+
+    def drain(self, driver):
+        """Move every response the browser finished loading since the last call into the archive"""
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            print(f"Could not read the performance log: {e}")
+            return
+        requests = self.pending.setdefault(driver.session_id, {})
+        finished = []
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method, params = message.get("method"), message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.requestWillBeSent":
+                request = params["request"]
+                requests[request_id] = {"method": request["method"], "url": request["url"],
+                                        "post_data": request.get("postData")}
+            elif method == "Network.responseReceived" and request_id in requests:
+                response = params["response"]
+                headers = {name.lower(): value for name, value in response.get("headers", {}).items()}
+                requests[request_id]["status"] = response["status"]
+                requests[request_id]["headers"] = {name: headers[name] for name in RESPONSE_HEADERS if name in headers}
+                if "content-type" not in requests[request_id]["headers"] and response.get("mimeType"):
+                    requests[request_id]["headers"]["content-type"] = response["mimeType"]
+            elif method == "Network.loadingFinished" and request_id in requests:
+                finished.append(request_id)
+            elif method == "Network.loadingFailed":
+                requests.pop(request_id, None)
+
+        for request_id in finished:
+            request = requests.pop(request_id)
+            if "status" not in request or request["url"].startswith("data:"):
+                continue
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception:
+                continue
+            data = base64.b64decode(body["body"]) if body.get("base64Encoded") else body["body"].encode()
+            with self.lock:
+                self.responses.append({
+                    "method": request["method"], "url": request["url"],
+                    "key": request_key(request["method"], request["url"], request["post_data"]),
+                    "status": request["status"], "headers": request["headers"],
+                    "body": self.store("bodies", data)
+                })
+
+    def capture(self, driver, label):
+        """Archive the traffic so far and a snapshot of the current DOM"""
+        self.drain(driver)
+        if not self.snapshots:
+            return
+        try:
+            html = driver.page_source
+            url = driver.current_url
+        except Exception:
+            return
+        with self.lock:
+            self.snapshot_index.append({"label": label, "url": url, "time": time.time() - self.started,
+                                        "html": self.store("snapshots", html.encode())})
+
+    def close(self):
+        """Write the index; the archive is complete from here on"""
+        with self.lock:
+            self.archive.writestr("index.json", json.dumps({
+                "page_url": calculator_page.CALCULATOR_PAGE_URL,
+                "recorded": self.started,
+                "responses": self.responses,
+                "snapshots": self.snapshot_index
+            }))
+            self.archive.close()
+        print(f"Session archive saved to {self.filename}: {len(self.responses)} responses, "
+              f"{len(self.snapshot_index)} snapshots, {os.path.getsize(self.filename) / 1024:.0f} KB")
+
+
+class SessionArchive:
+    def __init__(self, filename):
+        """Read a session archive"""
+        self.archive = zipfile.ZipFile(filename)
+        index = json.loads(self.archive.read("index.json"))
+        self.page_url = index["page_url"]
+        self.snapshots = index["snapshots"]
+        self.responses = {}  # key -> recorded responses in order
+        self.by_url = {}  # URL without query -> first recorded response
+        for response in index["responses"]:
+            self.responses.setdefault(response["key"], []).append(response)
+            self.by_url.setdefault(response["url"].split("?")[0], response)
+        self.origins = sorted({urlsplit(response["url"])[:2] for response in index["responses"]}, key=str)
+        self.served = {}  # key -> responses served so far
+        self.lock = threading.Lock()
+
+    def body(self, response):
+        return self.archive.read(response["body"])
+
+    def lookup(self, method, url, post_data=None):
+        """The recorded response for a request, in recorded order for repeated requests"""
+        with self.lock:
+            key = request_key(method, url, post_data)
+            recorded = self.responses.get(key) or self.responses.get(request_key(method, url))
+            if recorded:
+                count = self.served.get(key, 0)
+                self.served[key] = count + 1
+                # Repeat the last recording once a request is made more often than it was recorded
+                return recorded[min(count, len(recorded) - 1)]
+            return self.by_url.get(url.split("?")[0])
+
+    def extract_snapshots(self, folder):
+        """Write the DOM snapshots as numbered HTML files"""
+        os.makedirs(folder, exist_ok=True)
+        for number, snapshot in enumerate(self.snapshots, 1):
+            label = "".join(c if c.isalnum() else "_" for c in snapshot["label"])[:60]
+            with open(os.path.join(folder, f"{number:05d}_{label}.html"), "wb") as f:
+                f.write(self.archive.read(snapshot["html"]))
+        print(f"Wrote {len(self.snapshots)} snapshots to {folder}")
+
+
+class ReplayServer:
+    def __init__(self, archive, host="127.0.0.1", port=0):
+        """Serve a SessionArchive; https://host/path is served at /https/host/path"""
+        self.archive = archive if isinstance(archive, SessionArchive) else SessionArchive(archive)
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.misses = []  # URLs requested that the archive has no response for
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def page_url(self):
+        """The replayed stand-in for the recorded CALCULATOR_PAGE_URL"""
+        return self.local_url(self.archive.page_url)
+
+    def local_url(self, url):
+        scheme, host, path, query, _ = urlsplit(url)
+        return f"{self.base_url}/{scheme}/{host}{path or '/'}" + (f"?{query}" if query else "")
+
+    def remote_url(self, path, referer=None):
+        """Map a local path back to the recorded URL"""
+        parts = path.lstrip("/").split("/", 2)
+        if len(parts) >= 2 and (parts[0], parts[1]) in self.archive.origins:
+            return f"{parts[0]}://{parts[1]}/" + (parts[2] if len(parts) > 2 else "")
+        # A root-relative URL in a replayed page; it belongs to the page's origin
+        origin = urlsplit(self.archive.page_url)
+        if referer:
+            referer_parts = urlsplit(referer).path.lstrip("/").split("/", 2)
+            if len(referer_parts) >= 2 and (referer_parts[0], referer_parts[1]) in self.archive.origins:
+                origin = (referer_parts[0], referer_parts[1])
+        return f"{origin[0]}://{origin[1]}{path}"
+
+    def rewrite(self, data):
+        """Point every recorded origin in a text body at the replay server"""
+        text = data.decode("utf-8", errors="surrogateescape")
+        for scheme, host in self.archive.origins:
+            local = f"{self.base_url}/{scheme}/{host}"
+            text = text.replace(f"{scheme}://{host}", local)
+            text = text.replace(f"{scheme}:\\/\\/{host}", local.replace("/", "\\/"))
+        return text.encode("utf-8", errors="surrogateescape")
+
+    def handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self, method):
+                length = int(self.headers.get("Content-Length", 0))
+                post_data = self.rfile.read(length).decode("utf-8", errors="replace") if length else None
+                url = replay.remote_url(self.path, self.headers.get("Referer"))
+                response = replay.archive.lookup(method, url, post_data)
+                if response is None:
+                    replay.misses.append(url)
+                    self.send_error(404, f"Not recorded: {url}")
+                    return
+                data = replay.archive.body(response)
+                content_type = response["headers"].get("content-type", "")
+                if any(kind in content_type for kind in TEXT_TYPES):
+                    data = replay.rewrite(data)
+                self.send_response(response["status"])
+                for name, value in response["headers"].items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.respond("GET")
+
+            def do_POST(self):
+                self.respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.misses:
+            print(f"Replay had no recording for {len(self.misses)} requests, e.g. {self.misses[0]}")
+
+
+def main():
+    """Record and replay commands:
+
+    record <archive.zip> <individual|business> [country ...]   run the scraper and record the session
+    replay <archive.zip> [port]                                serve the archive
+    snapshots <archive.zip> [folder]                           write the DOM snapshots as HTML files
+    """
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "replay", "snapshots"):
+        print(main.__doc__)
+        return
+
+    command, filename = sys.argv[1], sys.argv[2]
+    if command == "record":
+        from scraper_engine import CalculatorScraper
+        from calculator_profiles import PROFILES
+        profile = PROFILES[sys.argv[3]] if len(sys.argv) > 3 else PROFILES["individual"]
+        scraper = CalculatorScraper(profile, output_prefix=f"recorded_{profile.name}")
+        scraper.run(num_tabs=1, countries=sys.argv[4:] or None, checkpoint_file=None, record=filename)
+    elif command == "replay":
+        server = ReplayServer(filename, port=int(sys.argv[3]) if len(sys.argv) > 3 else 8001)
+        print(f"Replaying {filename}; run a scraper with CALCULATOR_PAGE_URL={server.page_url}")
+        server.server.serve_forever()
+    else:
+        SessionArchive(filename).extract_snapshots(sys.argv[3] if len(sys.argv) > 3 else "snapshots")
+
+
+if __name__ == "__main__":
+    main()
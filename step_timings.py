@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Per-step latency instrumentation
+Records how long each scraping phase takes per tab, with timeouts and retries,
+and reports p50/p95/p99 as a table and as JSON at the end of a run
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from selenium.common.exceptions import TimeoutException
+
+PERCENTILES = (50, 95, 99)
+
+
+class StepTimer:
+    def __init__(self):
+        """Collect step durations from every worker thread"""
+        self.lock = threading.Lock()
+        # A context variable rather than a thread-local, so asyncio tasks can have tabs of their own
+        self.current_tab = contextvars.ContextVar("tab", default="main")
+        self.durations = {}  # (phase, tab) -> [seconds]
+        self.timeouts = {}  # (phase, tab) -> count
+        self.events = {}  # (event, tab) -> count, e.g. retries
+        self.started = time.time()
+
+    def set_tab(self, tab_id):
+        """Attribute the steps of the calling thread or task to a tab"""
+        self.current_tab.set(str(tab_id))
+
+    @property
+    def tab(self):
+        return self.current_tab.get()
+
+    @contextmanager
+    def measure(self, phase):
+        """Time a block; a TimeoutException, or step.timeout = True, counts as a timeout"""
+        step = TimedStep()
+        start_time = time.perf_counter()
+        try:
+            yield step
+        except TimeoutException:
+            step.timeout = True
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - start_time, step.timeout)
+
+    def record(self, phase, seconds, timeout=False):
+        key = (phase, self.tab)
+        with self.lock:
+            self.durations.setdefault(key, []).append(seconds)
+            if timeout:
+                self.timeouts[key] = self.timeouts.get(key, 0) + 1
+
+    def count(self, event):
+        """Count an event such as a retry for the calling thread's tab"""
+        key = (event, self.tab)
+        with self.lock:
+            self.events[key] = self.events.get(key, 0) + 1
+
+    def export(self):
+        """Raw samples as plain lists, e.g. to send from a worker process to the parent"""
+        with self.lock:
+            return {
+                "durations": [[phase, tab, list(samples)] for (phase, tab), samples in self.durations.items()],
+                "timeouts": [[phase, tab, count] for (phase, tab), count in self.timeouts.items()],
+                "events": [[event, tab, count] for (event, tab), count in self.events.items()]
+            }
+
+    def merge(self, data, tab_prefix=""):
+        """Add samples exported by another timer"""
+        with self.lock:
+            for phase, tab, samples in data["durations"]:
+                self.durations.setdefault((phase, tab_prefix + tab), []).extend(samples)
+            for phase, tab, count in data["timeouts"]:
+                key = (phase, tab_prefix + tab)
+                self.timeouts[key] = self.timeouts.get(key, 0) + count
+            for event, tab, count in data["events"]:
+                key = (event, tab_prefix + tab)
+                self.events[key] = self.events.get(key, 0) + count
+
+    def summarize(self, samples, timeouts):
+        values = np.array(samples)
+        p50, p95, p99 = np.percentile(values, PERCENTILES)
+        return {"count": len(samples), "timeouts": timeouts, "total": float(values.sum()),
+                "mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                "max": float(values.max())}
+
+    def build_report(self):
+        """{"elapsed", "phases": {phase: stats}, "tabs": {tab: {phase: stats}}, "events"}"""
+        with self.lock:
+            durations = {key: list(samples) for key, samples in self.durations.items()}
+            timeouts = dict(self.timeouts)
+            events = dict(self.events)
+
+        phases = {}
+        tabs = {}
+        for (phase, tab), samples in durations.items():
+            phases.setdefault(phase, ([], 0))
+            merged, phase_timeouts = phases[phase]
+            phases[phase] = (merged + samples, phase_timeouts + timeouts.get((phase, tab), 0))
+            tabs.setdefault(tab, {})[phase] = self.summarize(samples, timeouts.get((phase, tab), 0))
+
+        event_totals = {}
+        for (event, tab), count in events.items():
+            event_totals.setdefault(event, {"total": 0, "tabs": {}})
+            event_totals[event]["total"] += count
+            event_totals[event]["tabs"][tab] = count
+
+        return {
+            "elapsed": time.time() - self.started,
+            "phases": {phase: self.summarize(samples, count) for phase, (samples, count) in phases.items()},
+            "tabs": tabs,
+            "events": event_totals
+        }
+
+    def report(self, filename=None):
+        """Print the summary table and write the full report as JSON"""
+        report = self.build_report()
+        if not report["phases"]:
+            return report
+
+        print(f"\nStep timings over {report['elapsed']:.1f}s (seconds)")
+        print(f"{'Phase':<16} {'Count':>7} {'Timeouts':>9} {'p50':>7} {'p95':>7} {'p99':>7} {'Max':>7} {'Total':>9}")
+        for phase, stats in sorted(report["phases"].items(), key=lambda item: -item[1]["total"]):
+            print(f"{phase:<16} {stats['count']:>7} {stats['timeouts']:>9} {stats['p50']:>7.2f} "
+                  f"{stats['p95']:>7.2f} {stats['p99']:>7.2f} {stats['max']:>7.2f} {stats['total']:>9.1f}")
+        for tab, phases in sorted(report["tabs"].items()):
+            steps = sum(stats["count"] for stats in phases.values())
+            timeouts = sum(stats["timeouts"] for stats in phases.values())
+            busy = sum(stats["total"] for stats in phases.values())
+            print(f"  Tab {tab}: {steps} steps, {timeouts} timeouts, {busy:.1f}s busy")
+        for event, counts in sorted(report["events"].items()):
+            print(f"{event}: {counts['total']}")
+
+        if filename:
+            self.write(filename, report)
+            print(f"Timing report saved to {filename}")
+        return report
+
+    def write(self, filename, report=None):
+        """Write the report as JSON without printing it"""
+        if not filename:
+            return
+        with open(filename, "w") as f:
+            json.dump(report or self.build_report(), f, indent=2)
+
+
+class TimedStep:
+    def __init__(self):
+        self.timeout = False
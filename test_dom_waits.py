@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Result parsing and waits on placeholder results
+"""
+import json
+import shutil
+import subprocess
+import pytest
+from js_step_executor import PAGE_HELPERS
+from dom_waits import parse_carbon_value, result_value_changed
+
+PLACEHOLDERS = ["-- lbs CO2e", "Calculating... lbs CO2e", "lbs CO2e", "", None]
+
+
+@pytest.mark.parametrize("text", PLACEHOLDERS)
+def test_placeholders_have_no_value(text):
+    assert parse_carbon_value(text) is None
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1,369.07 lbs CO2e", 1369.07),
+    ("Your footprint: 772.92 lbs CO2e", 772.92),
+    ("12 lbs CO2e", 12.0),
+    ("1,000,000lbs", 1000000.0),
+])
+def test_reads_the_number_before_the_unit(text, value):
+    assert parse_carbon_value(text) == value
+
+
+class SnapshotDriver:
+    def __init__(self, text):
+        """Answers DOMSnapshot.take with a page showing one visible result"""
+        self.html = f'<html><body><div id="result" data-snapshot-visible="">{text}</div></body></html>'
+
+    def execute_script(self, script, *args):
+        return self.html
+
+
+@pytest.mark.parametrize("text", PLACEHOLDERS[:3])
+def test_result_wait_skips_placeholders(text):
+    assert result_value_changed("//div[@id='result']")(SnapshotDriver(text)) is False
+    assert result_value_changed("//div[@id='result']")(SnapshotDriver("50.00 lbs CO2e")) == "50.00 lbs CO2e"
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="needs node")
+def test_page_parser_matches_python_parser():
+    texts = PLACEHOLDERS[:4] + ["1,369.07 lbs CO2e", "Your footprint: 772.92 lbs CO2e", "12 lbs CO2e"]
+    script = PAGE_HELPERS + f"console.log(JSON.stringify({json.dumps(texts)}.map(t => parseValue(t))));"
+    output = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+    # NaN, the page's "no value", comes back from JSON as null
+    assert json.loads(output) == [parse_carbon_value(text) for text in texts]
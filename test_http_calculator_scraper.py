@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+HTTP scraper against the local stand-in calculator
+FixtureServer.expected_value is what the Selenium scrapers read off the page,
+so matching it means the HTTP and browser results agree
+"""
+import csv
+import pytest
+import calculator_page
+from fixture_server import FixtureServer
+from http_calculator_scraper import HttpCarbonCalculatorScraper, walk_for_factors
+
+ELECTRICITY_VALUES = [50, 100, 250, 500, 1000]
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer().start()
+    previous = calculator_page.CALCULATOR_PAGE_URL
+    calculator_page.use_calculator_page(server.page_url)
+    yield server
+    calculator_page.use_calculator_page(previous)
+    server.stop()
+
+
+def assert_matches_browser(server, results):
+    for country, measured in results.items():
+        for kwh, value in measured.items():
+            assert value == pytest.approx(server.expected_value(country, kwh), abs=0.011)
+
+
+def test_reads_script_filled_country_list(server):
+    scraper = HttpCarbonCalculatorScraper(reference_file=None)
+    results = scraper.run_analysis(ELECTRICITY_VALUES)
+
+    assert scraper.countries == server.config["countries"]
+    assert scraper.missing_countries == []
+    assert set(results) == set(server.config["countries"])
+    assert_matches_browser(server, results)
+
+
+def test_calibrates_against_reference_csv(server, tmp_path):
+    reference = tmp_path / "reference.csv"
+    with open(reference, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Country", "1000kwh"])
+        writer.writerow(["Austria", server.expected_value("Austria", 1000)])
+
+    scraper = HttpCarbonCalculatorScraper(reference_file=str(reference))
+    results = scraper.run_analysis(ELECTRICITY_VALUES)
+
+    assert scraper.scale == 12
+    assert results["Austria"][50] == pytest.approx(server.expected_value("Austria", 50), abs=0.011)
+    assert_matches_browser(server, results)
+
+
+def test_calibrates_against_fallback_measurement(server):
+    measured = []
+
+    def fallback(countries, electricity_values):
+        measured.append(countries)
+        return {country: {kwh: server.expected_value(country, kwh) for kwh in electricity_values}
+                for country in countries}
+
+    scraper = HttpCarbonCalculatorScraper(reference_file=None)
+    results = scraper.run_analysis(ELECTRICITY_VALUES, fallback=fallback)
+
+    assert measured == [[server.config["countries"][0]]]
+    assert_matches_browser(server, results)
+
+
+def test_unparsable_page_falls_back_to_browser():
+    server = FixtureServer()
+    server.config["countries"] = []
+    server.start()
+    calls = []
+
+    def fallback(countries, electricity_values):
+        calls.append(countries)
+        return {"Austria": {50: 1.0}}
+
+    try:
+        scraper = HttpCarbonCalculatorScraper(page_url=server.page_url, reference_file=None)
+        results = scraper.run_analysis(ELECTRICITY_VALUES, fallback=fallback)
+        with pytest.raises(ValueError):
+            HttpCarbonCalculatorScraper(page_url=server.page_url, reference_file=None).run_analysis(ELECTRICITY_VALUES)
+    finally:
+        server.stop()
+
+    assert calls == [None]
+    assert results == {"Austria": {50: 1.0}}
+
+
+def test_only_factor_keys_hold_factors():
+    factors = {}
+    data = {"population": {"Austria": 9.1}, "emissionFactors": {"Germany": 0.8}, "step_latency": 100}
+    walk_for_factors(data, {"Austria", "Germany"}, factors)
+    assert factors == {"Germany": 0.8}